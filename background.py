@@ -0,0 +1,155 @@
+"""
+Background Execution Helpers
+
+This module provides a long-lived asyncio event loop running on a daemon thread.
+Synchronous front ends such as the Streamlit app submit workflow coroutines to it
+instead of creating a new event loop per request, so model clients, HTTP
+connections and process-wide limits (e.g. the research scheduler) stay warm and
+shared across requests.
+
+On top of it, JobManager runs workflows as server-side jobs that outlive the
+request (or Streamlit rerun) that started them; front ends poll a job's
+progress events by cursor.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing_extensions import Any, Awaitable, Callable, Coroutine, List, Optional, Tuple
+
+
+class BackgroundEventLoop:
+    """An asyncio event loop that runs forever on its own daemon thread."""
+
+    def __init__(self, name: str = "factshield-event-loop"):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Coroutine[Any, Any, Any]) -> concurrent.futures.Future:
+        """Schedule a coroutine on the loop from any thread.
+
+        Args:
+            coro: Coroutine to run
+
+        Returns:
+            Thread-safe future resolving to the coroutine's result
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine[Any, Any, Any], timeout: float = None) -> Any:
+        """Run a coroutine on the loop and block the calling thread until it finishes."""
+        return self.submit(coro).result(timeout=timeout)
+
+
+class Job:
+    """A workflow running in the background, with the progress events it has published so far."""
+
+    def __init__(self, job_id: str, owner: Optional[str] = None):
+        self.job_id = job_id
+        self.owner = owner
+        self.status = "running"  # running, completed, failed or cancelled
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.future: Optional[concurrent.futures.Future] = None
+        self._events: List[Any] = []
+        self._lock = threading.Lock()
+
+    def publish(self, event: Any) -> None:
+        """Record a progress event; called from the job's coroutine."""
+        with self._lock:
+            self._events.append(event)
+
+    def events_since(self, cursor: int) -> Tuple[List[Any], int]:
+        """Return the events published after cursor, and the new cursor."""
+        with self._lock:
+            return self._events[cursor:], len(self._events)
+
+    @property
+    def done(self) -> bool:
+        return self.status != "running"
+
+
+class JobManager:
+    """
+    Runs workflow jobs on a background event loop and keeps them for polling.
+
+    Jobs are identified by id and optionally tagged with an owner (e.g. a UI
+    session) so that sessions only see their own jobs. Finished jobs are kept
+    until more than ``max_finished_jobs`` have accumulated.
+    """
+
+    def __init__(self, loop: BackgroundEventLoop, max_finished_jobs: int = 256):
+        self.loop = loop
+        self.max_finished_jobs = max_finished_jobs
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, run: Callable[[Job], Awaitable[Any]], owner: Optional[str] = None) -> Job:
+        """Start a job.
+
+        Args:
+            run: Coroutine function receiving the job, publishing progress through
+                job.publish() and returning the job result
+            owner: Optional owner id the job is visible to
+
+        Returns:
+            The started job
+        """
+        job = Job(uuid.uuid4().hex, owner=owner)
+
+        async def execute() -> None:
+            try:
+                job.result = await run(job)
+                job.status = "completed"
+            except asyncio.CancelledError:
+                job.status = "cancelled"
+            except Exception as e:
+                job.error = str(e)
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._prune()
+        job.future = self.loop.submit(execute())
+        return job
+
+    def get(self, job_id: str, owner: Optional[str] = None) -> Optional[Job]:
+        """Return a job by id, or None if unknown or owned by someone else."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or (owner is not None and job.owner != owner):
+            return None
+        return job
+
+    def cancel(self, job_id: str, owner: Optional[str] = None) -> bool:
+        """Cancel a running job; returns whether it was running."""
+        job = self.get(job_id, owner)
+        if job is None or job.done or job.future is None:
+            return False
+        cancelled = job.future.cancel()
+        if cancelled and not job.done:
+            # The job may be cancelled before its coroutine ever started
+            job.status = "cancelled"
+            job.finished_at = time.time()
+        return cancelled
+
+    def active_jobs(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.done)
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
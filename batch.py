@@ -0,0 +1,188 @@
+"""
+Batch Fact-Checking for FactShield
+
+Runs many claims through the fact-checking workflow without user interaction.
+Claims are read from a JSONL file, processed concurrently, and each result is
+appended to a JSONL output file as soon as its claim completes. Claims that the
+workflow cannot verify without clarification are recorded as unresolved
+instead of blocking on a prompt.
+
+Usage:
+    python batch.py claims.jsonl --output results.jsonl --workers 4
+
+Each input line is a JSON object holding the claim text under "claim" (or
+"text"/"body"), and optionally an identifier under "id" (or "request_id").
+
+With a persistent checkpointer (see checkpointing.py), re-running the same
+file resumes interrupted claims from their last completed node and returns
+the outcome of already finished claims from their checkpoint without
+re-running them.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing_extensions import Any, Dict, Iterator
+
+from langchain_core.messages import HumanMessage
+
+from cache import hash_key
+from main import get_agent, close_agent
+from metrics import instrument, export_run_metrics
+from budget import apply_run_budget
+from niceterminalui import print_banner, print_info, print_success, print_warning, print_error
+
+
+def read_claims(input_path: Path) -> Iterator[Dict[str, Any]]:
+    """Read claim records from a JSONL file.
+
+    Args:
+        input_path: Path to the JSONL input file
+
+    Yields:
+        Dictionaries with "id" and "claim" keys; malformed lines carry an "error" key instead
+    """
+    with open(input_path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield {"id": str(line_number), "claim": None, "error": f"Invalid JSON: {e}"}
+                continue
+
+            claim = record.get("claim") or record.get("text") or record.get("body")
+            claim_id = record.get("id") or record.get("request_id") or line_number
+            if not claim:
+                yield {"id": str(claim_id), "claim": None, "error": "No claim text found"}
+            else:
+                yield {"id": str(claim_id), "claim": claim}
+
+
+async def fact_check_claim(record: Dict[str, Any], recursion_limit: int = 50) -> Dict[str, Any]:
+    """Run the fact-checking workflow for a single claim without user interaction.
+
+    Args:
+        record: Claim record produced by read_claims
+        recursion_limit: LangGraph recursion limit for the run
+
+    Returns:
+        Result record with status "completed", "unresolved" or "error"
+    """
+    result = {"id": record["id"], "claim": record["claim"]}
+    if record.get("error"):
+        return {**result, "status": "error", "error": record["error"]}
+
+    # The thread id is stable across re-runs of the same claim, so checkpoints can be resumed
+    thread_id = f"batch-{record['id']}-{hash_key(record['claim'])[:8]}"
+    config = {
+        "configurable": {"thread_id": thread_id},
+        "recursion_limit": recursion_limit,
+    }
+    run_metrics = instrument(config)
+    run_budget = apply_run_budget(config)
+    started = time.perf_counter()
+
+    try:
+        agent = get_agent()
+        workflow_input = {"messages": [HumanMessage(content=record["claim"])]}
+        final_state = None
+        if agent.checkpointer is not None:
+            snapshot = await agent.aget_state(config)
+            if snapshot.next:
+                # Interrupted earlier: continue from the last completed node
+                workflow_input = None
+            elif snapshot.values.get("messages"):
+                # Finished earlier (completed or waiting for clarification): reuse the outcome
+                final_state = snapshot.values
+        if final_state is None:
+            final_state = await agent.ainvoke(workflow_input, config=config)
+    except Exception as e:
+        return {**result, "status": "error", "error": str(e), "elapsed_seconds": round(time.perf_counter() - started, 2)}
+    finally:
+        export_run_metrics(run_metrics, thread_id)
+
+    result["elapsed_seconds"] = round(time.perf_counter() - started, 2)
+    result["usage"] = run_budget.usage()
+    result["claim_statement"] = final_state.get("claim_statement")
+
+    if final_state.get("final_report"):
+        return {**result, "status": "completed", "final_report": final_state["final_report"]}
+
+    # The workflow stopped at clarify_fact_request: record the question instead of prompting
+    messages = final_state.get("messages", [])
+    clarification = messages[-1].content if messages else ""
+    return {**result, "status": "unresolved", "clarification": clarification}
+
+
+async def run_batch(input_path: Path, output_path: Path, workers: int = 4) -> Dict[str, int]:
+    """Fact-check every claim of a JSONL file concurrently.
+
+    Args:
+        input_path: JSONL file of claims
+        output_path: JSONL file receiving one result per claim, in completion order
+        workers: Maximum number of claims processed at the same time
+
+    Returns:
+        Count of results per status
+    """
+    semaphore = asyncio.Semaphore(workers)
+
+    async def worker(record: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            return await fact_check_claim(record)
+
+    tasks = [asyncio.create_task(worker(record)) for record in read_claims(input_path)]
+    print_info(f"Processing {len(tasks)} claims with {workers} workers")
+
+    counts = {"completed": 0, "unresolved": 0, "error": 0}
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(output_path, "a", encoding="utf-8") as out:
+            for task in asyncio.as_completed(tasks):
+                result = await task
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+
+                counts[result["status"]] += 1
+                if result["status"] == "completed":
+                    print_success(f"[{result['id']}] completed in {result['elapsed_seconds']}s")
+                elif result["status"] == "unresolved":
+                    print_warning(f"[{result['id']}] needs clarification")
+                else:
+                    print_error(f"[{result['id']}] failed: {result['error']}")
+    finally:
+        # Release the checkpointer's database connection, so the process can exit
+        await close_agent()
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fact-check a JSONL file of claims without interaction.")
+    parser.add_argument("input", type=Path, help="JSONL file with one claim per line")
+    parser.add_argument("--output", "-o", type=Path, default=Path("final_reports/batch_results.jsonl"),
+                        help="JSONL file results are appended to")
+    parser.add_argument("--workers", "-w", type=int, default=4,
+                        help="Number of claims fact-checked concurrently")
+    args = parser.parse_args()
+
+    print_banner(
+        title="FactShield",
+        subtitle="Batch Fact-Checking",
+        description="Multi-Agent Verification & Analysis",
+        subheader1=f"Input: {args.input}",
+        subheader2=f"Output: {args.output}"
+    )
+
+    counts = asyncio.run(run_batch(args.input, args.output, workers=args.workers))
+    print_info(
+        f"Done: {counts['completed']} completed, {counts['unresolved']} unresolved, {counts['error']} failed"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Offline Benchmark for FactShield
+
+Runs the fact-checker sub-agent, the supervisor and the full workflow end to
+end against deterministic fake models and recorded Tavily fixtures (see
+fakes.py), so pipeline performance can be measured locally without API keys.
+
+For each scenario it reports wall time, node-level timings (see metrics.py), calls per provider
+and peak Python memory (tracemalloc). Results can be saved as JSON and compared
+against a previous run to catch regressions before a deploy.
+
+Usage:
+    python benchmark.py --iterations 3 --output bench.json
+    python benchmark.py --compare bench.json --tolerance 0.2
+
+Provider caches and rate limits are disabled and checkpoints are kept in
+memory unless the corresponding environment variables are set explicitly.
+"""
+
+import os
+import tempfile
+
+# Measure the pipeline itself: no warm on-disk caches or checkpoint database
+os.environ.setdefault("SUMMARY_CACHE_ENABLED", "false")
+os.environ.setdefault("SEARCH_CACHE_ENABLED", "false")
+os.environ.setdefault("VERDICT_CACHE_ENABLED", "false")
+os.environ.setdefault("CHECKPOINTER", "memory")
+os.environ.setdefault("RATE_LIMITS", "")
+os.environ.setdefault("FACTSHIELD_CACHE_DIR", tempfile.mkdtemp(prefix="factshield-bench-cache-"))
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing_extensions import Any, Dict, List
+
+from langchain_core.messages import HumanMessage
+
+from fakes import FakeAsyncTavilyClient, FakeChatModel, FakeTavilyClient, ProviderStats
+from metrics import MetricsCallbackHandler, MetricsRegistry
+from utils import set_provider_overrides
+from factchecker_agent import get_factchecker_agent
+from factchecker_multi_agent_supervisor import get_supervisor_agent
+from main import get_agent
+from niceterminalui import print_banner, print_table, print_info, print_success, print_error
+
+DEFAULT_FIXTURES = Path(__file__).parent / "resources" / "benchmark" / "tavily_search.json"
+SCENARIOS = ("factchecker", "supervisor", "workflow")
+
+
+def scenario_runner(scenario: str, claim: str):
+    """Return (graph, input) for a benchmark scenario."""
+    if scenario == "factchecker":
+        return get_factchecker_agent(), {
+            "fact_checker_messages": [HumanMessage(content=claim)],
+            "claim_statement": claim,
+        }
+    if scenario == "supervisor":
+        return get_supervisor_agent(), {
+            "supervisor_messages": [HumanMessage(content=f"{claim}.")],
+            "claim_statement": claim,
+        }
+    return get_agent(), {"messages": [HumanMessage(content=claim)]}
+
+
+async def run_scenario(scenario: str, iterations: int, claim: str, stats: ProviderStats) -> Dict[str, Any]:
+    """Run one scenario several times and collect its measurements.
+
+    Args:
+        scenario: One of SCENARIOS
+        iterations: Number of measured runs
+        claim: Claim fact-checked in every run
+        stats: Provider call counters shared with the fakes
+
+    Returns:
+        Measurements of the scenario
+    """
+    stats.reset()
+    metrics = MetricsRegistry()
+    handler = MetricsCallbackHandler(metrics)
+    tracemalloc.reset_peak()
+    wall_times = []
+
+    for i in range(iterations):
+        graph, graph_input = scenario_runner(scenario, claim)
+        config = {
+            "configurable": {"thread_id": f"bench-{scenario}-{i}-{time.time_ns()}"},
+            "callbacks": [handler],
+            "recursion_limit": 100,
+        }
+        started = time.perf_counter()
+        await graph.ainvoke(graph_input, config=config)
+        wall_times.append(time.perf_counter() - started)
+
+    summary = metrics.summary()
+    return {
+        "iterations": iterations,
+        "wall_seconds": {
+            "mean": statistics.mean(wall_times),
+            "min": min(wall_times),
+            "max": max(wall_times),
+        },
+        "peak_memory_mb": tracemalloc.get_traced_memory()[1] / (1024 * 1024),
+        "provider_calls": {provider: count / iterations for provider, count in sorted(stats.calls.items())},
+        "provider_prompt_tokens": {provider: count / iterations for provider, count in sorted(stats.tokens.items())},
+        "nodes": {
+            node: {"count": timing["count"] / iterations, "total_seconds": timing["total_seconds"] / iterations}
+            for node, timing in summary["nodes"].items()
+        },
+        "model_tokens": {
+            model: {"input": usage["input_tokens"] / iterations, "output": usage["output_tokens"] / iterations}
+            for model, usage in summary["models"].items()
+        },
+    }
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """Install the fakes and run every requested scenario."""
+    stats = ProviderStats()
+    model_options = dict(
+        claim=args.claim,
+        research_topics=args.research_topics,
+        searches_per_agent=args.searches_per_agent,
+        stats=stats,
+    )
+    set_provider_overrides(
+        llm=FakeChatModel(provider="llm", latency_seconds=args.llm_latency, **model_options),
+        compress_llm=FakeChatModel(
+            provider="compress_llm", latency_seconds=args.llm_latency, answer_words=args.report_words, **model_options
+        ),
+        tavily_client=FakeTavilyClient(args.fixtures, latency_seconds=args.search_latency, stats=stats),
+        async_tavily_client=FakeAsyncTavilyClient(args.fixtures, latency_seconds=args.search_latency, stats=stats),
+    )
+
+    tracemalloc.start()
+    try:
+        results = {}
+        for scenario in args.scenarios:
+            results[scenario] = await run_scenario(scenario, args.iterations, args.claim, stats)
+        return results
+    finally:
+        tracemalloc.stop()
+        set_provider_overrides(llm=None, compress_llm=None, tavily_client=None, async_tavily_client=None)
+
+
+def print_results(results: Dict[str, Any]) -> None:
+    print_table(
+        "Scenarios",
+        ["Scenario", "Runs", "Mean (s)", "Min (s)", "Max (s)", "Peak memory (MB)"],
+        [
+            [
+                scenario,
+                str(result["iterations"]),
+                f"{result['wall_seconds']['mean']:.3f}",
+                f"{result['wall_seconds']['min']:.3f}",
+                f"{result['wall_seconds']['max']:.3f}",
+                f"{result['peak_memory_mb']:.1f}",
+            ]
+            for scenario, result in results.items()
+        ]
+    )
+    print_table(
+        "Provider calls (per run)",
+        ["Scenario", "Provider", "Calls", "Prompt tokens (est.)"],
+        [
+            [scenario, provider, f"{calls:g}", f"{result['provider_prompt_tokens'].get(provider, 0):.0f}"]
+            for scenario, result in results.items()
+            for provider, calls in result["provider_calls"].items()
+        ],
+        style="magenta"
+    )
+    for scenario, result in results.items():
+        print_table(
+            f"Node timings: {scenario} (per run)",
+            ["Node", "Runs", "Total (s)"],
+            [
+                [node, f"{timing['count']:g}", f"{timing['total_seconds']:.3f}"]
+                for node, timing in sorted(result["nodes"].items(), key=lambda item: -item[1]["total_seconds"])
+            ],
+            style="green"
+        )
+
+
+def compare_results(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return the regressions of results against a baseline run.
+
+    Args:
+        results: Measurements of this run
+        baseline: Measurements of a previous run (benchmark JSON output)
+        tolerance: Allowed relative increase of mean wall time and provider calls
+
+    Returns:
+        Human-readable description of each regression
+    """
+    regressions = []
+    for scenario, result in results.items():
+        previous = baseline.get("results", {}).get(scenario)
+        if previous is None:
+            continue
+        mean, previous_mean = result["wall_seconds"]["mean"], previous["wall_seconds"]["mean"]
+        if mean > previous_mean * (1 + tolerance):
+            regressions.append(f"{scenario}: mean wall time {mean:.3f}s vs {previous_mean:.3f}s")
+        for provider, calls in result["provider_calls"].items():
+            previous_calls = previous.get("provider_calls", {}).get(provider, 0)
+            if calls > previous_calls * (1 + tolerance):
+                regressions.append(f"{scenario}: {provider} calls per run {calls:g} vs {previous_calls:g}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fact-checking pipeline offline with fake providers.")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS),
+                        help="Graphs to benchmark")
+    parser.add_argument("--iterations", "-n", type=int, default=3, help="Measured runs per scenario")
+    parser.add_argument("--claim", default="The Great Wall of China is visible from space with the naked eye.",
+                        help="Claim fact-checked in every run")
+    parser.add_argument("--fixtures", type=Path, default=DEFAULT_FIXTURES, help="Tavily search fixtures (JSON)")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per fake model call")
+    parser.add_argument("--search-latency", type=float, default=0.02, help="Seconds per fake search")
+    parser.add_argument("--research-topics", type=int, default=2, help="Sub-agents launched by the fake supervisor")
+    parser.add_argument("--searches-per-agent", type=int, default=2, help="Searches made by each fake researcher")
+    parser.add_argument("--report-words", type=int, default=600, help="Length of fake compressed research and reports")
+    parser.add_argument("--output", "-o", type=Path, help="Write results as JSON")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON to compare against; exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression for --compare")
+    args = parser.parse_args()
+    # Resolve paths before switching to the scratch directory
+    args.fixtures = args.fixtures.resolve()
+    args.output = args.output.resolve() if args.output else None
+    args.compare = args.compare.resolve() if args.compare else None
+
+    print_banner(
+        title="FactShield",
+        subtitle="Offline Benchmark",
+        description="Fake models & recorded search fixtures",
+        subheader1=f"Scenarios: {', '.join(args.scenarios)}",
+        subheader2=f"Iterations: {args.iterations}"
+    )
+
+    # Reports written by the workflow go to a scratch directory
+    os.chdir(tempfile.mkdtemp(prefix="factshield-bench-"))
+    results = asyncio.run(run_benchmark(args))
+    print_results(results)
+
+    report = {"settings": {key: str(value) for key, value in vars(args).items()}, "results": results}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print_info(f"Results written to {args.output}")
+
+    if args.compare:
+        regressions = compare_results(results, json.loads(args.compare.read_text()), args.tolerance)
+        if regressions:
+            for regression in regressions:
+                print_error(regression)
+            sys.exit(1)
+        print_success("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
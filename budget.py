@@ -0,0 +1,217 @@
+"""
+Research and Run Budgets
+
+ResearchBudget limits each fact-checker sub-agent so that a single researcher
+cannot loop until LangGraph's recursion limit. Defaults come from the
+environment and can be overridden per run through the graph config:
+
+    config = {"configurable": {"research_budget": {"max_searches": 5}}}
+
+RunBudget caps the total spend of one claim across every stage (scoping,
+supervisor, sub-agents and report). It is passed through the graph config and
+charged for every model call (by a callback handler) and every search:
+
+    run_budget = apply_run_budget(config)
+    await agent.ainvoke(state, config=config)
+
+Once a run budget is nearly used, sub-agents compress what they have, queued
+sub-agents are skipped and the supervisor hands its notes to the final report.
+The final share of the budget (RUN_BUDGET_RESERVE) is kept for that report.
+With persistent checkpoints, usage is saved per run as it is charged, and a
+resumed run continues from the spend recorded before it was interrupted.
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field, fields, replace
+from typing_extensions import Any, Callable, Dict, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableConfig, ensure_config
+
+from metrics import token_usage
+from checkpointing import get_run_usage_store
+from run_scope import get_run_id
+
+
+@dataclass(frozen=True)
+class ResearchBudget:
+    """Per-sub-agent limits on tool rounds, searches, tokens and wall-clock time."""
+    max_iterations: int = int(os.getenv("RESEARCH_MAX_ITERATIONS", "8"))
+    max_searches: int = int(os.getenv("RESEARCH_MAX_SEARCHES", "10"))
+    max_tokens: int = int(os.getenv("RESEARCH_MAX_TOKENS", "200000"))
+    max_seconds: float = float(os.getenv("RESEARCH_MAX_SECONDS", "300"))
+
+    @classmethod
+    def from_config(cls, config: Optional[RunnableConfig] = None) -> "ResearchBudget":
+        """Build the budget for the current run, applying overrides from configurable.research_budget."""
+        overrides = ensure_config(config).get("configurable", {}).get("research_budget") or {}
+        if isinstance(overrides, ResearchBudget):
+            return overrides
+        known = {f.name for f in fields(cls)}
+        return replace(cls(), **{key: value for key, value in overrides.items() if key in known})
+
+    def remaining_searches(self, state: dict) -> int:
+        return max(0, self.max_searches - state.get("search_calls", 0))
+
+    def exhausted(self, state: dict) -> Optional[str]:
+        """Return why the sub-agent's budget is used up, or None if it may continue.
+
+        Args:
+            state: FactCheckerState of the sub-agent
+
+        Returns:
+            Human-readable reason, or None
+        """
+        if state.get("tool_call_iterations", 0) >= self.max_iterations:
+            return f"reached {self.max_iterations} tool rounds"
+        if state.get("search_calls", 0) >= self.max_searches:
+            return f"reached {self.max_searches} searches"
+        if state.get("tokens_used", 0) >= self.max_tokens:
+            return f"used {state.get('tokens_used', 0)} of {self.max_tokens} tokens"
+        started_at = state.get("started_at")
+        if started_at and time.time() - started_at >= self.max_seconds:
+            return f"ran for more than {self.max_seconds:.0f} seconds"
+        return None
+
+
+@dataclass
+class RunBudget:
+    """Per-claim limits on tokens, searches and cost, shared by every stage of one run.
+
+    A limit of 0 disables it. Cost is estimated from the token and search
+    prices (RUN_PRICE_*), in USD.
+    """
+    max_tokens: int = int(os.getenv("RUN_MAX_TOKENS", "1000000"))
+    max_searches: int = int(os.getenv("RUN_MAX_SEARCHES", "40"))
+    max_cost: float = float(os.getenv("RUN_MAX_COST", "0"))
+    # Fraction of the token and cost limits kept for the final report
+    reserve: float = float(os.getenv("RUN_BUDGET_RESERVE", "0.1"))
+    price_per_million_input_tokens: float = float(os.getenv("RUN_PRICE_INPUT_TOKENS", "0"))
+    price_per_million_output_tokens: float = float(os.getenv("RUN_PRICE_OUTPUT_TOKENS", "0"))
+    price_per_search: float = float(os.getenv("RUN_PRICE_SEARCH", "0"))
+    input_tokens: int = 0
+    output_tokens: int = 0
+    searches: int = 0
+    # Called with the usage totals after every charge, e.g. to persist them for resuming
+    on_charge: Optional[Callable[[Dict[str, int]], None]] = field(default=None, repr=False, compare=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    @classmethod
+    def from_config(cls, config: Optional[RunnableConfig] = None) -> Optional["RunBudget"]:
+        """Return the run budget of the current run (configurable.run_budget), or None if the run has none."""
+        run_budget = ensure_config(config).get("configurable", {}).get("run_budget")
+        return run_budget if isinstance(run_budget, RunBudget) else None
+
+    def charge(self, input_tokens: int = 0, output_tokens: int = 0, searches: int = 0) -> None:
+        with self._lock:
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+            self.searches += searches
+            self._charged()
+
+    def restore(self, totals: Optional[Dict[str, int]]) -> None:
+        """Continue from usage totals recorded earlier for the same run (e.g. before a crash)."""
+        if not totals:
+            return
+        with self._lock:
+            self.input_tokens = int(totals.get("input_tokens", 0))
+            self.output_tokens = int(totals.get("output_tokens", 0))
+            self.searches = int(totals.get("searches", 0))
+
+    def totals(self) -> Dict[str, int]:
+        return {"input_tokens": self.input_tokens, "output_tokens": self.output_tokens, "searches": self.searches}
+
+    def _charged(self) -> None:
+        # Called under the lock, so saved totals are never older than an earlier save
+        if self.on_charge is not None:
+            self.on_charge(self.totals())
+
+    @property
+    def tokens_used(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    @property
+    def cost(self) -> float:
+        return (
+            self.input_tokens * self.price_per_million_input_tokens / 1_000_000
+            + self.output_tokens * self.price_per_million_output_tokens / 1_000_000
+            + self.searches * self.price_per_search
+        )
+
+    def take_searches(self, requested: int) -> int:
+        """Atomically grant and charge up to ``requested`` searches; returns how many were granted."""
+        with self._lock:
+            granted = requested if not self.max_searches else max(0, min(requested, self.max_searches - self.searches))
+            self.searches += granted
+            if granted:
+                self._charged()
+            return granted
+
+    def exhausted(self) -> Optional[str]:
+        """Return why research should stop for this run, or None if it may continue.
+
+        Returns:
+            Human-readable reason, or None
+        """
+        research_share = 1 - self.reserve
+        if self.max_tokens and self.tokens_used >= self.max_tokens * research_share:
+            return f"used {self.tokens_used} of {self.max_tokens} tokens"
+        if self.max_searches and self.searches >= self.max_searches:
+            return f"ran {self.searches} of {self.max_searches} searches"
+        if self.max_cost and self.cost >= self.max_cost * research_share:
+            return f"spent ${self.cost:.4f} of ${self.max_cost:.2f}"
+        return None
+
+    def usage(self) -> Dict[str, Any]:
+        """Spend so far, for reports and logs."""
+        return {
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "searches": self.searches,
+            "cost": round(self.cost, 6),
+        }
+
+
+class RunBudgetCallbackHandler(BaseCallbackHandler):
+    """Callback handler charging the tokens of every model call to a RunBudget.
+
+    Searches are charged by the fact-checker's tool_node when it grants them
+    (RunBudget.take_searches), so that concurrent sub-agents cannot overshoot
+    the search limit.
+    """
+
+    run_inline = True
+
+    def __init__(self, run_budget: RunBudget):
+        self.run_budget = run_budget
+
+    def on_llm_end(self, response, **kwargs):
+        input_tokens, output_tokens = token_usage(response)
+        self.run_budget.charge(input_tokens=input_tokens, output_tokens=output_tokens)
+
+
+def apply_run_budget(config: dict, run_budget: Optional[RunBudget] = None) -> RunBudget:
+    """Attach a run budget and its accounting handler to a LangGraph config.
+
+    With persistent checkpoints, the budget continues from the usage recorded
+    for the config's run (thread) id and saves its usage as it is charged, so
+    resuming an interrupted run does not grant it a fresh budget.
+
+    Args:
+        config: Run config; its "configurable" and "callbacks" entries are extended in place
+        run_budget: Budget to enforce; defaults to the RUN_* environment limits
+
+    Returns:
+        The run budget, charged as the run progresses
+    """
+    run_budget = run_budget or RunBudget()
+    run_id = get_run_id(config)
+    usage_store = get_run_usage_store() if run_id is not None else None
+    if usage_store is not None:
+        run_budget.restore(usage_store.get(run_id))
+        run_budget.on_charge = lambda totals: usage_store.set(run_id, totals)
+    config.setdefault("configurable", {})["run_budget"] = run_budget
+    config["callbacks"] = list(config.get("callbacks") or []) + [RunBudgetCallbackHandler(run_budget)]
+    return run_budget
@@ -0,0 +1,531 @@
+"""
+Local Caches for FactShield
+
+This module provides a small SQLite-backed key/value store with TTL expiry and
+size-based LRU eviction, the content-addressed cache built on top of it for
+webpage evidence summaries, the two-tier cache placed in front of the Tavily
+search client, and the cache of completed fact-checks keyed by normalized
+claim statement.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing_extensions import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from state_research import EvidenceSummary
+from prompts import summarize_webpage_prompt, combine_webpage_summaries_prompt
+
+# Directory holding the on-disk cache databases
+cache_dir = Path(os.getenv("FACTSHIELD_CACHE_DIR", ".cache"))
+
+
+def hash_key(*parts: Any) -> str:
+    """Build a stable SHA-256 key from JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def env_flag(name: str, default: str) -> bool:
+    """Read a boolean flag from the environment."""
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+class SQLiteCache:
+    """
+    Thread-safe key/value store persisted in a local SQLite database.
+
+    Values are stored as JSON. Entries older than ``ttl_seconds`` are treated as
+    missing, and once the table holds more than ``max_entries`` rows the least
+    recently accessed ones are evicted.
+    """
+
+    def __init__(self, path: Path, table: str, ttl_seconds: float, max_entries: int):
+        self.path = Path(path)
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_accessed_at ON {self.table} (accessed_at)"
+            )
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired.
+
+        Args:
+            key: Cache key
+            max_age: Optional maximum age in seconds, tighter than the store TTL
+        """
+        entry = self.get_entry(key, max_age)
+        return entry[1] if entry is not None else None
+
+    def get_entry(self, key: str, max_age: Optional[float] = None) -> Optional[Tuple[float, Any]]:
+        """Return (created_at, value) for key, or None if missing or expired.
+
+        Args:
+            key: Cache key
+            max_age: Optional maximum age in seconds, tighter than the store TTL
+        """
+        now = time.time()
+        ttl = self.ttl_seconds if max_age is None else min(max_age, self.ttl_seconds)
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if now - created_at > ttl:
+                if now - created_at > self.ttl_seconds:
+                    self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                return None
+            self._conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+        return created_at, json.loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        """Store value under key, evicting expired and least recently used entries."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            self._evict(now)
+
+    def recent(self, limit: int, max_age: Optional[float] = None) -> List[Any]:
+        """Return up to limit unexpired values, most recently accessed first, without touching them.
+
+        Args:
+            limit: Maximum number of values returned
+            max_age: Optional maximum age in seconds, tighter than the store TTL
+        """
+        ttl = self.ttl_seconds if max_age is None else min(max_age, self.ttl_seconds)
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                f"SELECT value FROM {self.table} WHERE created_at >= ? ORDER BY accessed_at DESC LIMIT ?",
+                (time.time() - ttl, limit)
+            ).fetchall()
+        return [json.loads(value) for (value,) in rows]
+
+    def scan(self, prefix: str, max_age: Optional[float] = None) -> List[Any]:
+        """Return the unexpired values whose key starts with prefix, in key order, without touching them.
+
+        Args:
+            prefix: Key prefix (non-empty)
+            max_age: Optional maximum age in seconds, tighter than the store TTL
+        """
+        ttl = self.ttl_seconds if max_age is None else min(max_age, self.ttl_seconds)
+        # Keys sharing the prefix sort between the prefix and its successor, so the primary key index serves the range
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                f"SELECT value FROM {self.table} WHERE key >= ? AND key < ? AND created_at >= ? ORDER BY key",
+                (prefix, upper, time.time() - ttl)
+            ).fetchall()
+        return [json.loads(value) for (value,) in rows]
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute(
+            f"DELETE FROM {self.table} WHERE created_at < ?", (now - self.ttl_seconds,)
+        )
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+
+class SummaryCache:
+    """
+    Content-addressed cache of webpage evidence summaries.
+
+    Keys hash the URL, the raw page content, the summarization model and the
+    summarization and combine prompts, so editing a prompt or switching models
+    never serves a stale summary.
+    """
+
+    def __init__(self, store: SQLiteCache, model_id: str):
+        self.store = store
+        self.model_id = model_id
+        # Long pages are summarized per window and then merged, so both prompts shape the result
+        self.prompt_version = hash_key(summarize_webpage_prompt, combine_webpage_summaries_prompt)[:16]
+
+    def key(self, url: Optional[str], webpage_content: str) -> str:
+        return hash_key("summary", url or "", webpage_content, self.model_id, self.prompt_version)
+
+    def get(self, url: Optional[str], webpage_content: str) -> Optional[EvidenceSummary]:
+        """Return the cached summary for this page, if any."""
+        cached = self.store.get(self.key(url, webpage_content))
+        return EvidenceSummary.model_validate(cached) if cached is not None else None
+
+    def set(self, url: Optional[str], webpage_content: str, summary: EvidenceSummary) -> None:
+        """Cache the summary produced for this page."""
+        self.store.set(self.key(url, webpage_content), summary.model_dump())
+
+
+def create_summary_cache(model_id: str) -> Optional[SummaryCache]:
+    """Create the webpage summary cache from environment configuration.
+
+    Args:
+        model_id: Identifier of the summarization model, part of every cache key
+
+    Returns:
+        SummaryCache instance, or None when SUMMARY_CACHE_ENABLED is false
+    """
+    if not env_flag("SUMMARY_CACHE_ENABLED", "true"):
+        return None
+
+    store = SQLiteCache(
+        cache_dir / "summaries.sqlite3",
+        table="summaries",
+        ttl_seconds=float(os.getenv("SUMMARY_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+        max_entries=int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "5000")),
+    )
+    return SummaryCache(store, model_id)
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into a single in-flight call.
+
+    The first caller for a key runs the work; callers arriving while it is in
+    flight await the same result (or exception). Futures are tracked per event
+    loop, since they cannot be awaited from another one.
+    """
+
+    def __init__(self):
+        self._inflight: dict[tuple[int, str], asyncio.Future] = {}
+
+    async def run(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fetch for key unless an identical call is already in flight.
+
+        Args:
+            key: Identity of the call
+            fetch: Coroutine factory performing the work
+
+        Returns:
+            Result of the (possibly shared) call
+        """
+        loop = asyncio.get_running_loop()
+        inflight_key = (id(loop), key)
+        future = self._inflight.get(inflight_key)
+        if future is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leading call was cancelled; issue our own
+                return await self.run(key, fetch)
+
+        future = loop.create_future()
+        self._inflight[inflight_key] = future
+        try:
+            result = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[inflight_key]
+
+
+class SearchCache:
+    """
+    Two-tier cache of Tavily search responses with single-flight deduplication.
+
+    Responses live in an in-memory LRU tier and, optionally, in a persistent
+    SQLite tier shared across processes. News searches expire sooner than other
+    topics. Concurrent identical searches on the same event loop share one
+    in-flight request instead of each hitting the API.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        news_ttl_seconds: float,
+        max_entries: int,
+        store: Optional[SQLiteCache] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.news_ttl_seconds = news_ttl_seconds
+        self.max_entries = max_entries
+        self.store = store
+        self._memory: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._single_flight = SingleFlight()
+
+    @staticmethod
+    def key(query: str, max_results: int, topic: str, include_raw_content: bool) -> str:
+        normalized_query = " ".join(query.lower().split())
+        return hash_key("search", normalized_query, max_results, topic, include_raw_content)
+
+    def ttl_for(self, topic: str) -> float:
+        return self.news_ttl_seconds if topic == "news" else self.ttl_seconds
+
+    def get(self, key: str, topic: str) -> Optional[Any]:
+        """Return a fresh cached response, checking memory before the persistent tier."""
+        ttl = self.ttl_for(topic)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at <= ttl:
+                    self._memory.move_to_end(key)
+                    return value
+                del self._memory[key]
+
+        if self.store is not None:
+            entry = self.store.get_entry(key, max_age=ttl)
+            if entry is not None:
+                # Keep the stored creation time, so the memory copy expires with the row
+                created_at, value = entry
+                self._remember(key, value, created_at)
+                return value
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a response in every tier."""
+        self._remember(key, value, time.time())
+        if self.store is not None:
+            self.store.set(key, value)
+
+    def _remember(self, key: str, value: Any, created_at: float) -> None:
+        with self._lock:
+            self._memory[key] = (created_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    async def get_or_fetch(
+        self,
+        query: str,
+        max_results: int,
+        topic: str,
+        include_raw_content: bool,
+        fetch: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Return a cached response or fetch it, sharing in-flight identical requests.
+
+        Args:
+            query: Search query
+            max_results: Maximum number of results requested
+            topic: Search topic, selects the TTL
+            include_raw_content: Whether raw page content was requested
+            fetch: Coroutine factory performing the actual search
+
+        Returns:
+            Search response dictionary
+        """
+        key = self.key(query, max_results, topic, include_raw_content)
+        cached = self.get(key, topic)
+        if cached is not None:
+            return cached
+
+        async def fetch_and_store() -> Any:
+            result = await fetch()
+            self.set(key, result)
+            return result
+
+        return await self._single_flight.run(key, fetch_and_store)
+
+
+def create_search_cache() -> Optional[SearchCache]:
+    """Create the search response cache from environment configuration.
+
+    Returns:
+        SearchCache instance, or None when SEARCH_CACHE_ENABLED is false
+    """
+    if not env_flag("SEARCH_CACHE_ENABLED", "true"):
+        return None
+
+    ttl_seconds = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", str(24 * 3600)))
+    news_ttl_seconds = float(os.getenv("SEARCH_CACHE_NEWS_TTL_SECONDS", str(15 * 60)))
+
+    store = None
+    if env_flag("SEARCH_CACHE_PERSIST", "false"):
+        store = SQLiteCache(
+            cache_dir / "searches.sqlite3",
+            table="searches",
+            ttl_seconds=max(ttl_seconds, news_ttl_seconds),
+            max_entries=int(os.getenv("SEARCH_CACHE_PERSIST_MAX_ENTRIES", "5000")),
+        )
+
+    return SearchCache(
+        ttl_seconds=ttl_seconds,
+        news_ttl_seconds=news_ttl_seconds,
+        max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "256")),
+        store=store,
+    )
+
+
+_CLAIM_WORD_RE = re.compile(r"\w+")
+
+# Words whose presence flips a claim; fuzzy matches must agree on them
+NEGATION_WORDS = frozenset({
+    "not", "no", "never", "none", "nobody", "nothing", "neither", "nor",
+    "cannot", "cant", "isnt", "arent", "wasnt", "werent", "dont", "doesnt", "didnt", "wont",
+})
+
+
+def normalize_claim(claim: str) -> str:
+    """Normalize a claim statement for cache lookups (Unicode form, case, punctuation, whitespace)."""
+    text = unicodedata.normalize("NFKC", claim).lower().replace("'", "").replace("\u2019", "")
+    return " ".join(_CLAIM_WORD_RE.findall(text))
+
+
+def claim_shingles(normalized_claim: str, size: int = 2) -> Set[str]:
+    """Word shingles of a normalized claim (the words themselves for very short claims)."""
+    words = normalized_claim.split()
+    if len(words) < size:
+        return set(words)
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class VerdictCache:
+    """
+    Cache of completed fact-checks (final report and notes) keyed by normalized claim statement.
+
+    Exact lookups hash the normalized claim. With a fuzzy threshold, a miss
+    falls back to comparing word-shingle Jaccard similarity against recent
+    entries, so near-identical phrasings of the same claim also hit; claims
+    that differ in negation never match fuzzily. Fuzzy matching reads only the
+    normalized claims, kept in a separate index table under the same keys, and
+    loads the full entry of the best match alone.
+    """
+
+    def __init__(
+        self,
+        store: SQLiteCache,
+        claim_index: Optional[SQLiteCache] = None,
+        fuzzy_threshold: float = 0.0,
+        fuzzy_candidates: int = 1000,
+    ):
+        self.store = store
+        self.claim_index = claim_index
+        self.fuzzy_threshold = fuzzy_threshold
+        self.fuzzy_candidates = fuzzy_candidates
+
+    @staticmethod
+    def key(normalized_claim: str) -> str:
+        return hash_key("verdict", normalized_claim)
+
+    def get(self, claim_statement: str) -> Optional[Dict[str, Any]]:
+        """Return the cached fact-check of this claim, if fresh.
+
+        Args:
+            claim_statement: Claim statement written by write_claim_statement
+
+        Returns:
+            Cached entry (claim_statement, final_report, notes, created_at) with
+            "similarity" set to 1.0 for exact hits, or None on a miss
+        """
+        normalized = normalize_claim(claim_statement)
+        if not normalized:
+            return None
+        cached = self.store.get(self.key(normalized))
+        if cached is not None:
+            return {**cached, "similarity": 1.0}
+        if self.fuzzy_threshold <= 0 or self.claim_index is None:
+            return None
+
+        shingles = claim_shingles(normalized)
+        negations = NEGATION_WORDS.intersection(normalized.split())
+        best, best_similarity = None, self.fuzzy_threshold
+        for candidate_normalized in self.claim_index.recent(self.fuzzy_candidates):
+            if NEGATION_WORDS.intersection(candidate_normalized.split()) != negations:
+                continue
+            similarity = jaccard(shingles, claim_shingles(candidate_normalized))
+            if similarity >= best_similarity:
+                best, best_similarity = candidate_normalized, similarity
+        if best is None:
+            return None
+        cached = self.store.get(self.key(best))
+        if cached is None:
+            return None
+        # Refresh the index entry's LRU position along with the entry's
+        self.claim_index.get(self.key(best))
+        return {**cached, "similarity": round(best_similarity, 3)}
+
+    def set(self, claim_statement: str, final_report: str, notes: List[str]) -> None:
+        """Cache the fact-check completed for this claim."""
+        normalized = normalize_claim(claim_statement)
+        if not normalized:
+            return
+        self.store.set(self.key(normalized), {
+            "claim_statement": claim_statement,
+            "normalized_claim": normalized,
+            "final_report": final_report,
+            "notes": list(notes),
+            "created_at": time.time(),
+        })
+        if self.claim_index is not None:
+            self.claim_index.set(self.key(normalized), normalized)
+
+
+def create_verdict_cache() -> Optional[VerdictCache]:
+    """Create the completed fact-check cache from environment configuration.
+
+    Returns:
+        VerdictCache instance, or None when VERDICT_CACHE_ENABLED is false
+    """
+    if not env_flag("VERDICT_CACHE_ENABLED", "true"):
+        return None
+
+    ttl_seconds = float(os.getenv("VERDICT_CACHE_TTL_SECONDS", str(24 * 3600)))
+    max_entries = int(os.getenv("VERDICT_CACHE_MAX_ENTRIES", "2000"))
+    fuzzy_threshold = float(os.getenv("VERDICT_CACHE_FUZZY_THRESHOLD", "0"))
+    store = SQLiteCache(cache_dir / "verdicts.sqlite3", table="verdicts", ttl_seconds=ttl_seconds, max_entries=max_entries)
+    # Normalized claims alone, for fuzzy matching without loading reports; always
+    # maintained so that enabling fuzzy matching later covers existing entries
+    claim_index = SQLiteCache(
+        cache_dir / "verdicts.sqlite3", table="verdict_claims", ttl_seconds=ttl_seconds, max_entries=max_entries
+    )
+    return VerdictCache(
+        store,
+        claim_index=claim_index,
+        fuzzy_threshold=fuzzy_threshold,
+        fuzzy_candidates=int(os.getenv("VERDICT_CACHE_FUZZY_CANDIDATES", "1000")),
+    )
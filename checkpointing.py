@@ -0,0 +1,183 @@
+"""
+Persistent Checkpointing for Resumable Fact-Check Runs
+
+The full workflow (and the supervisor mounted inside it) is compiled with a
+checkpointer so that every completed node is saved under the run's
+``thread_id``. A run that crashes or times out can be resumed from its last
+completed node by invoking the workflow again with the same ``thread_id`` and
+``None`` as input.
+
+The SQLite saver owns an aiosqlite connection, which the process that created
+it must release with close_checkpointer once it is done running workflows.
+
+The backend is selected with CHECKPOINTER:
+    sqlite  Local SQLite database at CHECKPOINT_DB (default)
+    memory  In-process only; lost when the process exits
+    none    No checkpointing
+
+Small SQLite tables complement the checkpoints: completed sub-agent results
+keyed by run and research topic, so a supervisor step that is re-executed on
+resume does not research the same topic twice; each run's evidence store, so
+evidence IDs cited in checkpointed notes still resolve (and new sources keep
+numbering after them) in a resumed process; and each run's budget usage, so a
+resumed run keeps counting against the same run budget.
+"""
+
+import os
+from dataclasses import asdict
+from functools import lru_cache
+from typing_extensions import List, Optional
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+
+from cache import SQLiteCache, cache_dir, env_flag, hash_key
+from evidence_store import Evidence
+
+checkpointer_backend = os.getenv("CHECKPOINTER", "sqlite").lower()
+checkpoint_db = os.getenv("CHECKPOINT_DB", str(cache_dir / "checkpoints.sqlite3"))
+
+# How long per-run sub-agent results and evidence stores are kept for resuming
+run_state_ttl_seconds = float(os.getenv("RUN_STATE_TTL_SECONDS", str(7 * 24 * 3600)))
+run_state_max_entries = int(os.getenv("RUN_STATE_MAX_ENTRIES", "5000"))
+# Archived evidence entries (one per source of a run) kept for resuming
+evidence_archive_max_entries = int(os.getenv("EVIDENCE_ARCHIVE_MAX_ENTRIES", "100000"))
+
+
+def create_checkpointer() -> Optional[BaseCheckpointSaver]:
+    """Create the workflow checkpointer from environment configuration.
+
+    The SQLite saver binds to the running event loop, so this must be called
+    from inside the loop that will run the workflow.
+
+    Returns:
+        Checkpoint saver, or None when CHECKPOINTER is "none"
+    """
+    if checkpointer_backend == "none":
+        return None
+    if checkpointer_backend == "memory":
+        from langgraph.checkpoint.memory import InMemorySaver
+        return InMemorySaver()
+    if checkpointer_backend == "sqlite":
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        os.makedirs(os.path.dirname(checkpoint_db) or ".", exist_ok=True)
+        # The connection is opened lazily by the saver's setup() on first use. Its worker
+        # thread is a daemon so a connection left open (e.g. by a killed Streamlit server)
+        # cannot keep the interpreter alive; every checkpoint write is committed anyway.
+        conn = aiosqlite.connect(checkpoint_db)
+        conn.daemon = True
+        return AsyncSqliteSaver(conn)
+    raise ValueError(f"Unknown CHECKPOINTER backend: {checkpointer_backend!r} (expected sqlite, memory or none)")
+
+
+async def close_checkpointer(checkpointer: Optional[BaseCheckpointSaver]) -> None:
+    """Close the database connection of a checkpointer created by create_checkpointer.
+
+    Must be awaited on the event loop the checkpointer is bound to. Savers
+    without a connection (memory, none) are left as they are.
+    """
+    conn = getattr(checkpointer, "conn", None)
+    if conn is not None and conn.is_alive():
+        await conn.close()
+
+
+class ResearchResultCache:
+    """
+    Completed sub-agent results of a run, keyed by run id and research topic.
+
+    A supervisor step runs several sub-agents in one node; if the process dies
+    before the node finishes, LangGraph re-executes the whole node on resume.
+    Results stored here let the re-executed step reuse the researchers that
+    had already finished.
+    """
+
+    def __init__(self, store: SQLiteCache):
+        self.store = store
+
+    def key(self, run_id: str, research_topic: str) -> str:
+        return hash_key("research", run_id, research_topic.strip())
+
+    def get(self, run_id: str, research_topic: str) -> Optional[dict]:
+        return self.store.get(self.key(run_id, research_topic))
+
+    def set(self, run_id: str, research_topic: str, result: dict) -> None:
+        self.store.set(self.key(run_id, research_topic), {
+            "compressed_research": result.get("compressed_research", ""),
+            "raw_notes": list(result.get("raw_notes", [])),
+        })
+
+
+class RunUsageStore:
+    """Run budget usage totals (tokens and searches) of each run, keyed by run id."""
+
+    def __init__(self, store: SQLiteCache):
+        self.store = store
+
+    def key(self, run_id: str) -> str:
+        return hash_key("run_usage", run_id)
+
+    def get(self, run_id: str) -> Optional[dict]:
+        return self.store.get(self.key(run_id))
+
+    def set(self, run_id: str, totals: dict) -> None:
+        self.store.set(self.key(run_id), totals)
+
+
+class EvidenceArchive:
+    """
+    Persisted copy of each run's evidence store, one row per evidence entry.
+
+    Rows are keyed by run id and evidence ID, so registering a source writes a
+    single row (re-registering an upgraded source overwrites it) and a run's
+    entries are loaded back in ID order with one range query.
+    """
+
+    def __init__(self, store: SQLiteCache):
+        self.store = store
+
+    def run_prefix(self, run_id: str) -> str:
+        return hash_key("evidence", run_id) + ":"
+
+    def key(self, run_id: str, evidence_id: str) -> str:
+        # Zero-padded so that key order is ID order (E2 before E10)
+        return f"{self.run_prefix(run_id)}{int(evidence_id.lstrip('E')):08d}"
+
+    def load(self, run_id: str) -> List[Evidence]:
+        return [Evidence(**entry) for entry in self.store.scan(self.run_prefix(run_id))]
+
+    def append(self, run_id: str, evidence: Evidence) -> None:
+        self.store.set(self.key(run_id, evidence.evidence_id), asdict(evidence))
+
+
+def _run_state_store(table: str, max_entries: int = run_state_max_entries) -> SQLiteCache:
+    return SQLiteCache(
+        cache_dir / "runs.sqlite3",
+        table=table,
+        ttl_seconds=run_state_ttl_seconds,
+        max_entries=max_entries,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_research_result_cache() -> Optional[ResearchResultCache]:
+    """Return the sub-agent result cache, or None without persistent checkpoints or with RESUME_REUSE_RESULTS off."""
+    if checkpointer_backend in ("none", "memory") or not env_flag("RESUME_REUSE_RESULTS", "true"):
+        return None
+    return ResearchResultCache(_run_state_store("research_results"))
+
+
+@lru_cache(maxsize=None)
+def get_evidence_archive() -> Optional[EvidenceArchive]:
+    """Return the evidence store archive, or None without persistent checkpoints."""
+    if checkpointer_backend in ("none", "memory"):
+        return None
+    return EvidenceArchive(_run_state_store("evidence_entries", max_entries=evidence_archive_max_entries))
+
+
+@lru_cache(maxsize=None)
+def get_run_usage_store() -> Optional[RunUsageStore]:
+    """Return the run budget usage store, or None without persistent checkpoints."""
+    if checkpointer_backend in ("none", "memory"):
+        return None
+    return RunUsageStore(_run_state_store("run_usage"))
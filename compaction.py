@@ -0,0 +1,101 @@
+"""
+Message History Compaction for the Research Loop
+
+The fact-checker sub-agent re-sends its whole message history on every turn,
+and that history is dominated by formatted search output. Once the history
+exceeds a token threshold, this module replaces the content of older tool
+messages with compact evidence references (ID, title, stance) while keeping
+the most recent turns verbatim. Compaction only affects what is sent to the
+model; the graph state keeps the full messages.
+"""
+
+import os
+import re
+from typing_extensions import List, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+
+from relevance import estimate_tokens
+
+# History size (estimated tokens) above which older tool outputs are compacted
+compaction_token_threshold = int(os.getenv("COMPACTION_TOKEN_THRESHOLD", "30000"))
+
+# Number of most recent model turns (AI message plus its tool results) kept verbatim
+compaction_keep_recent_turns = int(os.getenv("COMPACTION_KEEP_RECENT_TURNS", "2"))
+
+# Characters kept from compacted outputs of tools other than tavily_search
+compaction_max_chars = int(os.getenv("COMPACTION_MAX_CHARS", "500"))
+
+_SOURCE_RE = re.compile(r"--- SOURCE (\S+): (.*?) ---")
+_STANCE_RE = re.compile(r"<stance>\s*(.*?)\s*</stance>", re.DOTALL)
+_SUMMARY_RE = re.compile(r"SUMMARY:\n(?:<summary>\s*)?(.*?)(?:\n|$)")
+
+# Characters of each source's summary kept as its gist in compacted search output
+compaction_gist_chars = 160
+
+
+def message_tokens(messages: Sequence[BaseMessage]) -> int:
+    """Estimate the token count of a message history."""
+    return sum(estimate_tokens(str(message.content)) for message in messages)
+
+
+def compact_search_output(content: str) -> str:
+    """Reduce a formatted tavily_search output to one reference line (ID, title, stance, gist) per source."""
+    blocks = content.split("\n\n--- SOURCE ")[1:]
+    references = []
+    for block in blocks:
+        match = _SOURCE_RE.match("--- SOURCE " + block)
+        if not match:
+            continue
+        source_id, title = match.groups()
+        stance = _STANCE_RE.search(block)
+        stance_text = f" (stance: {stance.group(1)})" if stance else ""
+        summary = _SUMMARY_RE.search(block)
+        gist = summary.group(1).strip()[:compaction_gist_chars] if summary else ""
+        references.append(f"- {source_id} {title}{stance_text}" + (f": {gist}" if gist else ""))
+
+    if not references:
+        return content[:compaction_max_chars]
+    return "[Earlier search results, compacted; cite by ID]\n" + "\n".join(references)
+
+
+def compact_tool_message(message: ToolMessage) -> ToolMessage:
+    """Return a copy of a tool message with compact content."""
+    content = str(message.content)
+    if message.name == "tavily_search":
+        compacted = compact_search_output(content)
+    elif len(content) > compaction_max_chars:
+        compacted = content[:compaction_max_chars] + "... [compacted]"
+    else:
+        return message
+    return message.model_copy(update={"content": compacted})
+
+
+def compact_messages(
+    messages: Sequence[BaseMessage],
+    token_threshold: int = compaction_token_threshold,
+    keep_recent_turns: int = compaction_keep_recent_turns,
+) -> List[BaseMessage]:
+    """Compact older tool outputs once the history grows past a token threshold.
+
+    Args:
+        messages: Research loop message history
+        token_threshold: Estimated token count above which compaction applies
+        keep_recent_turns: Number of most recent AI turns whose tool results stay verbatim
+
+    Returns:
+        Message list to send to the model
+    """
+    messages = list(messages)
+    if message_tokens(messages) <= token_threshold:
+        return messages
+
+    ai_indices = [i for i, message in enumerate(messages) if isinstance(message, AIMessage)]
+    if len(ai_indices) <= keep_recent_turns:
+        return messages
+    verbatim_from = ai_indices[-keep_recent_turns] if keep_recent_turns > 0 else len(messages)
+
+    return [
+        compact_tool_message(message) if i < verbatim_from and isinstance(message, ToolMessage) else message
+        for i, message in enumerate(messages)
+    ]
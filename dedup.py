@@ -0,0 +1,155 @@
+"""
+Duplicate Detection for Search Results
+
+This module canonicalizes URLs (scheme, host, tracking parameters, AMP and
+mobile variants) and detects near-duplicate page content with 64-bit SimHash
+fingerprints, so that syndicated copies and mirrors of the same article are
+summarized only once per claim run.
+"""
+
+import hashlib
+import os
+import threading
+from collections import Counter
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from typing_extensions import Dict, List, Optional
+
+from relevance import tokenize
+
+# Click and campaign identifiers only (lowercase); generic names such as "ref"
+# can select content (e.g. a branch on code hosts) and are kept
+TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "ref_src", "ref_url", "cmpid", "ocid", "smid", "_ga", "_gl",
+})
+TRACKING_PREFIXES = ("utm_", "at_", "pk_", "mtm_")
+HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+
+# SimHash fingerprints within this Hamming distance are treated as the same document
+near_duplicate_max_distance = int(os.getenv("NEAR_DUPLICATE_MAX_DISTANCE", "3"))
+
+# Pages with fewer tokens than this are only deduplicated by URL
+near_duplicate_min_tokens = int(os.getenv("NEAR_DUPLICATE_MIN_TOKENS", "50"))
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalize a URL so that trivial variants of the same page compare equal.
+
+    Lowercases the host, drops the scheme distinction, "www."/"m."/"amp." host
+    prefixes, fragments, tracking query parameters, AMP path suffixes and
+    trailing slashes. Remaining query parameters are sorted.
+
+    Args:
+        url: URL as returned by the search API
+
+    Returns:
+        Canonical form of the URL
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.endswith(":80") or host.endswith(":443"):
+        host = host.rsplit(":", 1)[0]
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+
+    path = parts.path or "/"
+    for suffix in ("/amp", "/amp/", ".amp", ".amp.html", "/index.html", "/index.htm"):
+        if path.endswith(suffix):
+            path = path[: -len(suffix)] or "/"
+            break
+    path = path.rstrip("/") or "/"
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+
+def simhash(text: str, max_tokens: int = 20000) -> int:
+    """Compute a 64-bit SimHash fingerprint of text over word 3-shingles."""
+    tokens = tokenize(text)[:max_tokens]
+    shingles = Counter(" ".join(tokens[i:i + 3]) for i in range(max(1, len(tokens) - 2)))
+
+    weights = [0] * 64
+    for shingle, count in shingles.items():
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += count if (h >> bit) & 1 else -count
+
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class NearDuplicateIndex:
+    """
+    Clusters of equivalent pages seen during one claim run.
+
+    A page joins an existing cluster when its canonical URL was already seen or
+    its content fingerprint is within ``max_distance`` bits of a cluster's
+    fingerprint. The cluster id is used as the evidence store key, so each
+    cluster is summarized at most once.
+    """
+
+    def __init__(self, max_distance: int = near_duplicate_max_distance, min_tokens: int = near_duplicate_min_tokens):
+        self.max_distance = max_distance
+        self.min_tokens = min_tokens
+        self._lock = threading.Lock()
+        self._clusters_by_url: Dict[str, str] = {}
+        self._fingerprints: List[tuple[int, str]] = []
+
+    def assign(self, url: str, text: Optional[str]) -> str:
+        """Return the cluster id for a page, creating a new cluster if needed.
+
+        Args:
+            url: Page URL
+            text: Page content used for fingerprinting
+
+        Returns:
+            Cluster id (the canonical URL of the cluster's first page)
+        """
+        canonical_url = canonicalize_url(url)
+        fingerprint = None
+        if text and len(tokenize(text)) >= self.min_tokens:
+            fingerprint = simhash(text)
+
+        with self._lock:
+            cluster_id = self._clusters_by_url.get(canonical_url)
+            if cluster_id is None and fingerprint is not None:
+                cluster_id = next(
+                    (cid for fp, cid in self._fingerprints if hamming_distance(fp, fingerprint) <= self.max_distance),
+                    None
+                )
+            if cluster_id is None:
+                cluster_id = canonical_url
+                if fingerprint is not None:
+                    self._fingerprints.append((fingerprint, cluster_id))
+            self._clusters_by_url[canonical_url] = cluster_id
+            return cluster_id
+
+
+def collapse_near_duplicates(unique_results: dict, index: NearDuplicateIndex) -> dict:
+    """Assign search results to clusters and keep one result per cluster.
+
+    Args:
+        unique_results: Dictionary mapping URLs to search results
+        index: Near-duplicate index of the current claim run
+
+    Returns:
+        Results with a "cluster_id" key, without near-duplicates of earlier results in the same search
+    """
+    collapsed = {}
+    seen_clusters = set()
+    for url, result in unique_results.items():
+        cluster_id = index.assign(url, result.get("raw_content") or result.get("content"))
+        if cluster_id in seen_clusters:
+            continue
+        seen_clusters.add(cluster_id)
+        collapsed[url] = {**result, "cluster_id": cluster_id}
+    return collapsed
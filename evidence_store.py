@@ -0,0 +1,158 @@
+"""
+Shared Evidence Store
+
+Every source summarized during a claim run is registered once in the run's
+evidence store under its canonical URL (or near-duplicate cluster) and given a
+short ID such as ``E3``. Concurrent sub-agents consult the store before
+summarizing a page, search outputs and compressed research cite sources by ID,
+and the final report resolves IDs to titles and URLs from the store instead of
+re-embedding full page text.
+"""
+
+import threading
+from dataclasses import dataclass, field
+from typing_extensions import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from cache import SingleFlight
+from state_research import EvidenceSummary
+
+
+@dataclass
+class Evidence:
+    """A summarized source registered in the evidence store."""
+    evidence_id: str
+    key: str
+    url: str
+    title: str
+    summary: str
+    stance: str = "Unclear"
+    key_excerpts: List[str] = field(default_factory=list)
+    # False when summary holds a search snippet or truncated page text instead of a model summary
+    structured: bool = True
+
+    def format_reference(self) -> str:
+        """One-line reference: ID, title, URL and stance."""
+        return f"[{self.evidence_id}] {self.title}: {self.url} (stance: {self.stance})"
+
+
+class EvidenceStore:
+    """
+    Per-run registry of summarized sources, keyed by canonical URL or cluster id.
+
+    Each source is summarized at most once per run, even when several
+    sub-agents find it at the same time. A source registered without a
+    structured summary (a search snippet, or the fallback text of a failed
+    summarization) is upgraded in place, keeping its ID, once a structured
+    summary becomes available.
+    """
+
+    def __init__(self, on_add: Optional[Callable[[Evidence], None]] = None):
+        """
+        Args:
+            on_add: Optional callback invoked with each newly registered source (e.g. to persist it)
+        """
+        self._lock = threading.Lock()
+        self._by_key: Dict[str, Evidence] = {}
+        self._by_id: Dict[str, Evidence] = {}
+        self._single_flight = SingleFlight()
+        self._on_add = on_add
+
+    def restore(self, entries: Iterable[Evidence]) -> None:
+        """Re-register previously persisted sources, keeping their IDs."""
+        with self._lock:
+            for evidence in entries:
+                self._by_key[evidence.key] = evidence
+                self._by_id[evidence.evidence_id] = evidence
+
+    def get(self, key: str) -> Optional[Evidence]:
+        with self._lock:
+            return self._by_key.get(key)
+
+    def get_by_id(self, evidence_id: str) -> Optional[Evidence]:
+        with self._lock:
+            return self._by_id.get(evidence_id)
+
+    def add(
+        self,
+        key: str,
+        url: str,
+        title: str,
+        summary: str,
+        stance: str = "Unclear",
+        key_excerpts: Optional[List[str]] = None,
+        structured: bool = True,
+    ) -> Evidence:
+        """Register a source, returning the existing entry if the key is already known.
+
+        A structured summary replaces an existing unstructured entry under the same ID.
+        """
+        with self._lock:
+            existing = self._by_key.get(key)
+            if existing is not None and (existing.structured or not structured):
+                return existing
+            evidence = Evidence(
+                evidence_id=existing.evidence_id if existing is not None else f"E{len(self._by_id) + 1}",
+                key=key,
+                url=url,
+                title=title,
+                summary=summary,
+                stance=stance,
+                key_excerpts=list(key_excerpts or []),
+                structured=structured,
+            )
+            self._by_key[key] = evidence
+            self._by_id[evidence.evidence_id] = evidence
+            if self._on_add is not None:
+                self._on_add(evidence)
+            return evidence
+
+    async def get_or_add(
+        self,
+        key: str,
+        url: str,
+        title: str,
+        summarize: Callable[[], Awaitable[Optional[EvidenceSummary]]],
+        fallback: Callable[[], str],
+    ) -> Evidence:
+        """Return the evidence for key, summarizing the source unless it already has a structured summary.
+
+        Args:
+            key: Canonical URL or near-duplicate cluster id
+            url: Source URL
+            title: Source title
+            summarize: Coroutine factory returning a structured summary, or None on failure
+            fallback: Produces the text stored when no structured summary is available
+
+        Returns:
+            Evidence entry shared by every agent of the run
+        """
+        existing = self.get(key)
+        if existing is not None and existing.structured:
+            return existing
+
+        async def summarize_and_add() -> Evidence:
+            summary = await summarize()
+            if summary is None:
+                # Keeps an existing unstructured entry; a later result may still upgrade it
+                return self.add(key, url, title, fallback(), structured=False)
+            return self.add(
+                key, url, title,
+                summary=summary.summary,
+                stance=summary.stance,
+                key_excerpts=summary.key_excerpts,
+            )
+
+        return await self._single_flight.run(key, summarize_and_add)
+
+    def all(self) -> List[Evidence]:
+        """Every registered source, in registration order."""
+        with self._lock:
+            return list(self._by_id.values())
+
+    def format_references(self, evidence_ids: Optional[Iterable[str]] = None) -> str:
+        """Format references for the given IDs (or all sources), one per line."""
+        if evidence_ids is None:
+            entries = self.all()
+        else:
+            entries = [e for e in (self.get_by_id(i) for i in evidence_ids) if e is not None]
+        return "\n".join(evidence.format_reference() for evidence in entries)
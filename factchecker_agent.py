@@ -1,55 +1,177 @@
-from typing_extensions import Literal
+import asyncio
+import os
+import time
+import uuid
+
+from functools import lru_cache
+from typing_extensions import Dict, Literal, Optional, Tuple
 
 from langgraph.graph import StateGraph, START, END
-from langchain_core.messages import SystemMessage, HumanMessage, ToolMessage, filter_messages
+from langchain_core.messages import SystemMessage, HumanMessage, ToolMessage, AIMessage, filter_messages, get_buffer_string
+from langchain_core.runnables import RunnableConfig
 
 from state_research import FactCheckerState, FactCheckerOutputState
-from utils import get_today_str, create_llm, create_compress_llm
+from utils import get_today_str, create_llm, create_compress_llm, llm_model_id, compress_llm_model_id
+from rate_limit import aretry
+from cache import env_flag
 from tools import tavily_search, think_tool
-from prompts import research_agent_prompt, compress_research_system_prompt, compress_research_human_message
+from compaction import compact_messages
+from budget import ResearchBudget, RunBudget
+from prompts import (
+    research_agent_prompt,
+    compress_research_system_prompt,
+    compress_research_human_message,
+    running_summary_update_prompt,
+    compress_research_finalize_prompt,
+)
 
 
 # Set up tools and model binding
 tools = [tavily_search, think_tool]
 tools_by_name = {tool.name: tool for tool in tools}
 
-# Initialize models
-model = create_llm()
-model_with_tools = model.bind_tools(tools)
-summarization_model = create_llm()
-compress_model = create_compress_llm()
+# Maximum number of tool calls from one model turn executed at the same time
+max_concurrent_tool_calls = int(os.getenv("TOOL_MAX_CONCURRENCY", "4"))
+
+# Keep a running summary updated in the background after each tool round. Off by
+# default: it adds compress-model calls and only saves time when the finalize
+# call is markedly faster than compressing the whole history
+incremental_compression = env_flag("INCREMENTAL_COMPRESSION", "false")
+
+
+class RunningSummary:
+    """
+    Running summary of one sub-agent's research, updated by a background task.
+
+    tool_node hands each finished round to update() and returns without
+    waiting, so the compress-model call overlaps the next llm_call and
+    tool_node instead of delaying them. At most one update runs at a time;
+    rounds finished meanwhile are folded in together by the next one.
+    compress_research stops the update in progress rather than waiting for it
+    and finalizes from the last completed summary.
+    """
+
+    def __init__(self):
+        self.summary = ""
+        self.summarized_messages = 0
+        self.unreported_tokens = 0
+        self.task: Optional[asyncio.Task] = None
+        self._pending: Optional[Tuple[str, list]] = None
+
+    def update(self, research_topic: str, messages: list) -> None:
+        """Fold the messages not yet summarized into the summary in the background."""
+        self._pending = (research_topic, list(messages))
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
 
+    def stop(self) -> None:
+        """Cancel the update in progress; the summary keeps the last completed update."""
+        self._pending = None
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
 
-def llm_call(state: FactCheckerState):
+    def take_tokens(self) -> int:
+        """Return the tokens used by updates since the last call, for the sub-agent's budget."""
+        tokens, self.unreported_tokens = self.unreported_tokens, 0
+        return tokens
+
+    async def _run(self) -> None:
+        while self._pending is not None:
+            research_topic, messages = self._pending
+            self._pending = None
+            await self._summarize(research_topic, messages)
+
+    async def _summarize(self, research_topic: str, messages: list) -> None:
+        new_messages = messages[self.summarized_messages:]
+        if not new_messages:
+            return
+
+        prompt = running_summary_update_prompt.format(
+            research_topic=research_topic,
+            date=get_today_str(),
+            running_summary=self.summary or "(empty)",
+            new_research=get_buffer_string(new_messages),
+        )
+        try:
+            response = await aretry(
+                lambda: create_compress_llm().ainvoke([HumanMessage(content=prompt)]), provider=compress_llm_model_id()
+            )
+        except Exception as e:
+            # The unsummarized messages are picked up by the next update or by compress_research
+            print(f"Failed to update running summary: {str(e)}")
+            return
+        usage = getattr(response, "usage_metadata", None) or {}
+        self.summary = str(response.content)
+        self.summarized_messages = len(messages)
+        self.unreported_tokens += usage.get("total_tokens", 0)
+
+
+# Running summaries of the sub-agents in progress, by research_id
+running_summaries: Dict[str, RunningSummary] = {}
+
+
+async def llm_call(state: FactCheckerState):
     """Analyze current state and decide on next actions.
     
     The model analyzes the current conversation state and decides whether to:
     1. Call search tools to gather more information
     2. Provide a final answer based on gathered information
+
+    Older search outputs are compacted to evidence references once the
+    history exceeds COMPACTION_TOKEN_THRESHOLD.
     
-    Returns updated state with the model's response.
+    Returns updated state with the model's response and token usage, including
+    tokens of running summary updates that finished in the background.
     """
+    research_id = state.get("research_id") or uuid.uuid4().hex
+    # Taken before the first model call, so RESEARCH_MAX_SECONDS counts it too
+    started_at = state.get("started_at") or time.time()
+    messages = (
+        [SystemMessage(content=research_agent_prompt.format(date=get_today_str()))]
+        + compact_messages(state["fact_checker_messages"])
+    )
+    response = await aretry(lambda: create_llm().bind_tools(tools).ainvoke(messages), provider=llm_model_id())
+    usage = getattr(response, "usage_metadata", None) or {}
+    running_summary = running_summaries.get(research_id)
     return {
-        "fact_checker_messages": [
-            model_with_tools.invoke(
-                [SystemMessage(content=research_agent_prompt)] + state["fact_checker_messages"]
-            )
-        ]
+        "fact_checker_messages": [response],
+        "tokens_used": usage.get("total_tokens", 0) + (running_summary.take_tokens() if running_summary else 0),
+        "started_at": started_at,
+        "research_id": research_id,
     }
 
-def tool_node(state: FactCheckerState):
+async def tool_node(state: FactCheckerState, config: RunnableConfig):
     """Execute all tool calls from the previous LLM response.
     
-    Executes all tool calls from the previous LLM responses.
-    Returns updated state with tool execution results.
+    Independent tool calls run concurrently, bounded by TOOL_MAX_CONCURRENCY.
+    Searches beyond the sub-agent's (or the run's) remaining search budget are
+    not executed. With INCREMENTAL_COMPRESSION, the round is then folded into
+    the running summary in the background.
+    Returns updated state with tool execution results, in tool call order,
+    and the updated budget counters.
     """
     tool_calls = state["fact_checker_messages"][-1].tool_calls
- 
-    # Execute all tool calls
-    observations = []
-    for tool_call in tool_calls:
+    semaphore = asyncio.Semaphore(max_concurrent_tool_calls)
+    search_calls = [tool_call for tool_call in tool_calls if tool_call["name"] == "tavily_search"]
+    remaining_searches = min(len(search_calls), ResearchBudget.from_config(config).remaining_searches(state))
+    run_budget = RunBudget.from_config(config)
+    if run_budget is not None:
+        remaining_searches = run_budget.take_searches(remaining_searches)
+    allowed_ids = {tool_call["id"] for tool_call in search_calls[:remaining_searches]}
+
+    async def execute(tool_call: dict):
+        if tool_call["name"] == "tavily_search" and tool_call["id"] not in allowed_ids:
+            return "Search budget exhausted; this search was not executed."
         tool = tools_by_name[tool_call["name"]]
-        observations.append(tool.invoke(tool_call["args"]))
+        args = tool_call["args"]
+        if tool.name == "tavily_search":
+            # Injected argument, hidden from the model
+            args = {**args, "claim": state.get("claim_statement") or ""}
+        async with semaphore:
+            return await tool.ainvoke(args)
+
+    # Execute all tool calls
+    observations = await asyncio.gather(*(execute(tool_call) for tool_call in tool_calls))
             
     # Create tool message outputs
     tool_outputs = [
@@ -59,19 +181,52 @@ def tool_node(state: FactCheckerState):
             tool_call_id=tool_call["id"]
         ) for observation, tool_call in zip(observations, tool_calls)
     ]
+
+    if incremental_compression:
+        running_summary = running_summaries.setdefault(state["research_id"], RunningSummary())
+        running_summary.update(state.get("claim_statement") or "", list(state["fact_checker_messages"]) + tool_outputs)
     
-    return {"fact_checker_messages": tool_outputs}
+    return {
+        "fact_checker_messages": tool_outputs,
+        "tool_call_iterations": state.get("tool_call_iterations", 0) + 1,
+        "search_calls": state.get("search_calls", 0) + len(allowed_ids),
+    }
 
-def compress_research(state: FactCheckerState) -> dict:
+def _without_pending_tool_calls(messages: list) -> list:
+    """Drop a trailing AI message whose tool calls were never executed (budget stop)."""
+    if messages and isinstance(messages[-1], AIMessage) and messages[-1].tool_calls:
+        return messages[:-1]
+    return messages
+
+async def compress_research(state: FactCheckerState) -> dict:
     """Compress research findings into a concise summary.
     
-    Takes all the research messages and tool outputs and creates
-    a compressed summary suitable for the supervisor's decision-making.
+    Any running summary update still in progress is cancelled. With a running
+    summary available, only the messages not yet folded into it are sent along
+    with the summary for a short finalize call. Otherwise
+    all the research messages and tool outputs are compressed at once into a
+    summary suitable for the supervisor's decision-making. When the budget
+    stopped the loop, the last model turn's unanswered tool calls are dropped.
     """
-    
-    system_message = compress_research_system_prompt.format(date=get_today_str())
-    messages = [SystemMessage(content=system_message)] + state.get("fact_checker_messages", []) + [HumanMessage(content=compress_research_human_message)]
-    response = compress_model.invoke(messages)
+    research_messages = _without_pending_tool_calls(list(state.get("fact_checker_messages", [])))
+    running_summary = running_summaries.pop(state.get("research_id"), None)
+    if running_summary is not None:
+        running_summary.stop()
+
+    if running_summary is not None and running_summary.summary:
+        final_messages = research_messages[running_summary.summarized_messages:]
+        prompt = compress_research_finalize_prompt.format(
+            research_topic=state.get("claim_statement") or "",
+            date=get_today_str(),
+            running_summary=running_summary.summary,
+            final_messages=get_buffer_string(final_messages) or "(none)",
+        )
+        messages = [HumanMessage(content=prompt)]
+    else:
+        system_message = compress_research_system_prompt.format(date=get_today_str())
+        human_message = compress_research_human_message.format(research_topic=state.get("claim_statement") or "")
+        messages = [SystemMessage(content=system_message)] + research_messages + [HumanMessage(content=human_message)]
+    response = await aretry(lambda: create_compress_llm().ainvoke(messages), provider=compress_llm_model_id())
     
     # Extract raw notes from tool and AI messages
     raw_notes = [
@@ -87,11 +242,14 @@ def compress_research(state: FactCheckerState) -> dict:
     }
 
 
-def should_continue(state: FactCheckerState) -> Literal["tool_node", "compress_research"]:
+def should_continue(state: FactCheckerState, config: RunnableConfig) -> Literal["tool_node", "compress_research"]:
     """Determine whether to continue research or provide final answer.
     
     Determines whether the agent should continue the research loop or provide
-    a final answer based on whether the LLM made tool calls.
+    a final answer based on whether the LLM made tool calls and whether the
+    sub-agent's research budget (configurable.research_budget, with
+    RESEARCH_MAX_* defaults) or the run budget (configurable.run_budget) is
+    used up.
     
     Returns:
         "tool_node": Continue to tool execution
@@ -99,34 +257,56 @@ def should_continue(state: FactCheckerState) -> Literal["tool_node", "compress_r
     """
     messages = state["fact_checker_messages"]
     last_message = messages[-1]
-    
-    # If the LLM makes a tool call, continue to tool execution
+
+    # If the LLM makes a tool call, continue to tool execution unless the budget is used up
     if last_message.tool_calls:
+        reason = ResearchBudget.from_config(config).exhausted(state)
+        if reason:
+            print(f"Research budget exhausted ({reason}); compressing findings")
+            return "compress_research"
+        run_budget = RunBudget.from_config(config)
+        reason = run_budget.exhausted() if run_budget is not None else None
+        if reason:
+            print(f"Run budget nearly used ({reason}); compressing findings")
+            return "compress_research"
         return "tool_node"
     # Otherwise, we have a final answer
     return "compress_research"
 
 # ===== GRAPH CONSTRUCTION =====
 
-# Build the agent workflow
-agent_builder = StateGraph(FactCheckerState, output_schema=FactCheckerOutputState)
-
-# Add nodes to the graph
-agent_builder.add_node("llm_call", llm_call)
-agent_builder.add_node("tool_node", tool_node)
-agent_builder.add_node("compress_research", compress_research)
-
-# Add edges to connect nodes
-agent_builder.add_edge(START, "llm_call")
-agent_builder.add_conditional_edges(
-    "llm_call",
-    should_continue,
-    {
-        "tool_node": "tool_node", # Continue research loop
-        "compress_research": "compress_research", # Provide final answer
-    },
-)
-agent_builder.add_edge("tool_node", "llm_call") # Loop back for more research
-agent_builder.add_edge("compress_research", END)
+def build_factchecker_agent():
+    """Build and compile the fact-checker sub-agent workflow."""
+    agent_builder = StateGraph(FactCheckerState, output_schema=FactCheckerOutputState)
+
+    # Add nodes to the graph
+    agent_builder.add_node("llm_call", llm_call)
+    agent_builder.add_node("tool_node", tool_node)
+    agent_builder.add_node("compress_research", compress_research)
+
+    # Add edges to connect nodes
+    agent_builder.add_edge(START, "llm_call")
+    agent_builder.add_conditional_edges(
+        "llm_call",
+        should_continue,
+        {
+            "tool_node": "tool_node", # Continue research loop
+            "compress_research": "compress_research", # Provide final answer
+        },
+    )
+    agent_builder.add_edge("tool_node", "llm_call") # Loop back for more research
+    agent_builder.add_edge("compress_research", END)
+
+    # Sub-agents run concurrently inside one supervisor node; they must not inherit
+    # the parent's checkpointer, whose namespace they would otherwise share
+    return agent_builder.compile(checkpointer=False, name="factchecker")
+
+@lru_cache(maxsize=None)
+def get_factchecker_agent():
+    """Return the compiled sub-agent, compiling it on first use."""
+    return build_factchecker_agent()
 
-factchecker_agent = agent_builder.compile()
\ No newline at end of file
+def __getattr__(name: str):
+    if name == "factchecker_agent":
+        return get_factchecker_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,5 +1,6 @@
 import os
 from datetime import datetime
+from functools import lru_cache
 from typing_extensions import Literal
 
 from langchain.chat_models import init_chat_model
@@ -9,13 +10,12 @@ from langgraph.types import Command
 
 from prompts import clarify_fact_request_instructions, transform_messages_into_claim_prompt
 from state_scope import AgentState, AgentInputState, ClarifyClaim, FactCheckClaim
-from utils import get_today_str, create_llm
+from utils import get_today_str, create_llm, llm_model_id
+from rate_limit import retry
 from dotenv import load_dotenv
 
 load_dotenv()
 
-model = create_llm() 
-
 def clarify_fact_request(state: AgentState) -> Command[Literal["write_claim_statement", "__end__"]]:
     """
     Determine if the user's input statement contains enough factual information to begin fact-checking.
@@ -25,14 +25,15 @@ def clarify_fact_request(state: AgentState) -> Command[Literal["write_claim_stat
     - If the input is a question, opinion, or insufficient for verification, return a clarification request instead.
     - Prevents hallucination or irrelevant analysis by strictly routing to either clarification or fact-check initiation.
     """
-    structured_output_model = model.with_structured_output(ClarifyClaim)
+    structured_output_model = create_llm().with_structured_output(ClarifyClaim)
 
-    response = structured_output_model.invoke([
+    messages = [
         HumanMessage(content=clarify_fact_request_instructions.format(
             messages=get_buffer_string(messages=state["messages"]), 
             date=get_today_str()
         ))
-    ])
+    ]
+    response = retry(lambda: structured_output_model.invoke(messages), provider=llm_model_id())
 
     if response.need_clarification:
         return Command(
@@ -56,15 +57,16 @@ def write_claim_statement(state: AgentState):
     - Guaranteeing the final brief follows the required format for effective fact-checking.
     """
     # Set up structured output model
-    structured_output_model = model.with_structured_output(FactCheckClaim)
+    structured_output_model = create_llm().with_structured_output(FactCheckClaim)
 
     # Generate research brief from conversation history
-    response = structured_output_model.invoke([
+    messages = [
         HumanMessage(content=transform_messages_into_claim_prompt.format(
             messages=get_buffer_string(state.get("messages", [])),
             date=get_today_str()
         ))
-    ])
+    ]
+    response = retry(lambda: structured_output_model.invoke(messages), provider=llm_model_id())
 
     # Update state with generated research brief and pass it to the supervisor
     return {
@@ -72,12 +74,24 @@ def write_claim_statement(state: AgentState):
         "supervisor_messages": [HumanMessage(content=f"{response.claim_statement}.")]
     }
 
-workflow = StateGraph(AgentState, input_schema=AgentInputState)
+def build_scope_graph():
+    """Build and compile the claim scoping workflow."""
+    workflow = StateGraph(AgentState, input_schema=AgentInputState)
+
+    workflow.add_node("clarify_fact_request", clarify_fact_request)
+    workflow.add_node("write_claim_statement", write_claim_statement)
+
+    workflow.add_edge(START, "clarify_fact_request")
+    workflow.add_edge("write_claim_statement", END)
 
-workflow.add_node("clarify_fact_request", clarify_fact_request)
-workflow.add_node("write_claim_statement", write_claim_statement)
+    return workflow.compile(name="scope")
 
-workflow.add_edge(START, "clarify_fact_request")
-workflow.add_edge("write_claim_statement", END)
+@lru_cache(maxsize=None)
+def get_scope_graph():
+    """Return the compiled scoping graph, compiling it on first use."""
+    return build_scope_graph()
 
-graph = workflow.compile()
+def __getattr__(name: str):
+    if name == "graph":
+        return get_scope_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,5 +1,4 @@
-import asyncio
-
+from functools import lru_cache
 from typing_extensions import Literal
 
 from langchain.chat_models import init_chat_model
@@ -14,14 +13,19 @@ from langgraph.graph import StateGraph, START, END
 from langgraph.types import Command
 
 from prompts import lead_researcher_prompt
-from factchecker_agent import factchecker_agent
+from factchecker_agent import get_factchecker_agent
 from state_multi_agent_supervisor import (
     SupervisorState, 
     ConductResearch, 
     ResearchComplete
 )
-from utils import get_today_str, create_llm
+from utils import get_today_str, create_llm, llm_model_id
+from rate_limit import aretry
 from tools import think_tool
+from scheduler import research_scheduler
+from run_scope import get_run_id
+from checkpointing import get_research_result_cache
+from budget import RunBudget
 
 def get_notes_from_tool_calls(messages: list[BaseMessage]) -> list[str]:
     """Extract research notes from ToolMessage objects in supervisor message history.
@@ -41,14 +45,13 @@ def get_notes_from_tool_calls(messages: list[BaseMessage]) -> list[str]:
     return [tool_msg.content for tool_msg in filter_messages(messages, include_types="tool")]
 
 
-supervisor_tools = [ConductResearch, ResearchComplete, think_tool]
-supervisor_model = create_llm()
-supervisor_model_with_tools = supervisor_model.bind_tools(supervisor_tools)
+# Tool schemas bound to the supervisor model (distinct from the supervisor_tools node below)
+supervisor_tool_schemas = [ConductResearch, ResearchComplete, think_tool]
 
 
 max_researcher_iterations = 6 # Calls to think_tool + ConductResearch
 
-max_concurrent_researchers = 3
+max_concurrent_researchers = research_scheduler.max_concurrent
 
 
 async def supervisor(state: SupervisorState) -> Command[Literal["supervisor_tools"]]:
@@ -76,7 +79,9 @@ async def supervisor(state: SupervisorState) -> Command[Literal["supervisor_tool
     messages = [SystemMessage(content=system_message)] + supervisor_messages
 
     # Make decision about next research steps
-    response = await supervisor_model_with_tools.ainvoke(messages)
+    response = await aretry(
+        lambda: create_llm().bind_tools(supervisor_tool_schemas).ainvoke(messages), provider=llm_model_id()
+    )
 
     return Command(
         goto="supervisor_tools",
@@ -93,7 +98,9 @@ async def supervisor_tools(state: SupervisorState) -> Command[Literal["superviso
     - Executing think_tool calls for strategic reflection
     - Launching parallel research agents for different topics
     - Aggregating research results
-    - Determining when research is complete
+    - Determining when research is complete, or when the run budget
+      (configurable.run_budget) is nearly used and the report must be written
+      from the notes gathered so far
 
     Args:
         state: Current supervisor state with messages and iteration count
@@ -104,10 +111,12 @@ async def supervisor_tools(state: SupervisorState) -> Command[Literal["superviso
     supervisor_messages = state.get("supervisor_messages", [])
     research_iterations = state.get("research_iterations", 0)
     most_recent_message = supervisor_messages[-1]
+    run_budget = RunBudget.from_config()
 
     # Initialize variables for single return pattern
     tool_messages = []
     all_raw_notes = []
+    incomplete_research = []  # Reasons the findings are partial, which keep the verdict out of the cache
     next_step = "supervisor"  # Default next step
     should_end = False
 
@@ -119,7 +128,12 @@ async def supervisor_tools(state: SupervisorState) -> Command[Literal["superviso
         for tool_call in most_recent_message.tool_calls
     )
 
-    if exceeded_iterations or no_tool_calls or research_complete:
+    budget_reason = run_budget.exhausted() if run_budget is not None else None
+
+    if exceeded_iterations or no_tool_calls or research_complete or budget_reason:
+        if budget_reason:
+            print(f"Run budget nearly used ({budget_reason}); moving on to the final report")
+            incomplete_research.append(f"Run budget nearly used: {budget_reason}")
         should_end = True
         next_step = END
 
@@ -150,19 +164,55 @@ async def supervisor_tools(state: SupervisorState) -> Command[Literal["superviso
 
             # Handle ConductResearch calls (asynchronous)
             if conduct_research_calls:
-                # Launch parallel research agents
-                coros = [
-                    factchecker_agent.ainvoke({
-                        "researcher_messages": [
-                            HumanMessage(content=tool_call["args"]["research_topic"])
+                # Launch research agents through the process-wide scheduler, which bounds
+                # how many run at once and queues the rest
+                factchecker_agent = get_factchecker_agent()
+                run_id = get_run_id()
+                result_cache = get_research_result_cache() if run_id else None
+
+                async def research(research_topic: str) -> dict:
+                    # Researchers still queued when the run budget runs out are not started
+                    if run_budget is not None and run_budget.exhausted():
+                        return {
+                            "compressed_research": "Research skipped: the run budget was used up before this topic started.",
+                            "skipped": True,
+                        }
+                    # Reuse results of researchers that finished before a crash when this step is resumed
+                    if result_cache is not None:
+                        cached = result_cache.get(run_id, research_topic)
+                        if cached is not None:
+                            return cached
+                    result = await factchecker_agent.ainvoke({
+                        "fact_checker_messages": [
+                            HumanMessage(content=research_topic)
                         ],
-                        "research_topic": tool_call["args"]["research_topic"]
-                    }) 
+                        "claim_statement": research_topic
+                    })
+                    if result_cache is not None:
+                        result_cache.set(run_id, research_topic, result)
+                    return result
+
+                coro_factories = [
+                    lambda research_topic=tool_call["args"]["research_topic"]: research(research_topic)
                     for tool_call in conduct_research_calls
                 ]
 
                 # Wait for all research to complete
-                tool_results = await asyncio.gather(*coros)
+                tool_results = await research_scheduler.run_all(coro_factories)
+
+                incomplete_research.extend(
+                    f"Research failed: {result}" if isinstance(result, Exception)
+                    else f"Research skipped: {tool_call['args']['research_topic'][:100]}"
+                    for result, tool_call in zip(tool_results, conduct_research_calls)
+                    if isinstance(result, Exception) or result.get("skipped") or "compressed_research" not in result
+                )
+
+                # A failed or timed-out researcher reports its error instead of aborting the others
+                tool_results = [
+                    {"compressed_research": f"Error synthesizing research report: {result}"}
+                    if isinstance(result, Exception) else result
+                    for result in tool_results
+                ]
 
                 # Format research results as tool messages
                 # Each sub-agent returns compressed research findings in result["compressed_research"]
@@ -186,6 +236,15 @@ async def supervisor_tools(state: SupervisorState) -> Command[Literal["superviso
 
         except Exception as e:
             print(f"Error in supervisor tools: {e}")
+            incomplete_research.append(f"Error in supervisor tools: {e}")
+            should_end = True
+            next_step = END
+
+        # Research spent the rest of the run budget: report on what was found instead of another round
+        budget_reason = run_budget.exhausted() if run_budget is not None else None
+        if not should_end and budget_reason:
+            print(f"Run budget nearly used ({budget_reason}); moving on to the final report")
+            incomplete_research.append(f"Run budget nearly used: {budget_reason}")
             should_end = True
             next_step = END
 
@@ -194,7 +253,10 @@ async def supervisor_tools(state: SupervisorState) -> Command[Literal["superviso
         return Command(
             goto=next_step,
             update={
-                "notes": get_notes_from_tool_calls(supervisor_messages),
+                "supervisor_messages": tool_messages,
+                "raw_notes": all_raw_notes,
+                "incomplete_research": incomplete_research,
+                "notes": get_notes_from_tool_calls(list(supervisor_messages) + tool_messages),
                 "claim_statement": state.get("claim_statement", "")
             }
         )
@@ -203,12 +265,30 @@ async def supervisor_tools(state: SupervisorState) -> Command[Literal["superviso
             goto=next_step,
             update={
                 "supervisor_messages": tool_messages,
-                "raw_notes": all_raw_notes
+                "raw_notes": all_raw_notes,
+                "incomplete_research": incomplete_research
             }
         )
 
-supervisor_builder = StateGraph(SupervisorState)
-supervisor_builder.add_node("supervisor", supervisor)
-supervisor_builder.add_node("supervisor_tools", supervisor_tools)
-supervisor_builder.add_edge(START, "supervisor")
-supervisor_agent = supervisor_builder.compile()
+def build_supervisor_agent(checkpointer=None):
+    """Build and compile the supervisor workflow.
+
+    Args:
+        checkpointer: Checkpoint saver for standalone use; when None and mounted in
+            the full workflow, the supervisor inherits the parent's checkpointer
+    """
+    supervisor_builder = StateGraph(SupervisorState)
+    supervisor_builder.add_node("supervisor", supervisor)
+    supervisor_builder.add_node("supervisor_tools", supervisor_tools)
+    supervisor_builder.add_edge(START, "supervisor")
+    return supervisor_builder.compile(checkpointer=checkpointer, name="supervisor_subgraph")
+
+@lru_cache(maxsize=None)
+def get_supervisor_agent():
+    """Return the compiled supervisor, compiling it on first use."""
+    return build_supervisor_agent()
+
+def __getattr__(name: str):
+    if name == "supervisor_agent":
+        return get_supervisor_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
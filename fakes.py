@@ -0,0 +1,259 @@
+"""
+Deterministic Stand-ins for Model and Search Providers
+
+Fake chat models and Tavily clients used by the offline benchmark
+(benchmark.py). They reproduce the shape of real provider traffic without API
+keys or network access:
+
+- FakeChatModel answers like the real agents would: the supervisor delegates a
+  fixed number of research topics and then completes, researchers run a fixed
+  number of searches and then answer, structured output schemas are filled with
+  canned values, and plain prompts get canned Markdown (streamed word by word).
+- FakeTavilyClient / FakeAsyncTavilyClient serve recorded search fixtures.
+
+Every call sleeps for a configurable latency and is counted in a shared
+ProviderStats instance.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import typing
+from collections import Counter
+from pathlib import Path
+from typing_extensions import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import BaseModel, ConfigDict
+
+from relevance import estimate_tokens
+
+FILLER_SENTENCES = [
+    "Multiple independent sources were reviewed for this claim [E1].",
+    "Astronaut accounts do not support naked-eye visibility from orbit [E2].",
+    "The structure is long but narrow, and its color matches the surrounding terrain [E1].",
+    "Photographs taken with telephoto lenses are not evidence of unaided visibility [E3].",
+    "The myth predates human spaceflight and has been repeated in textbooks [E2].",
+]
+
+
+class ProviderStats:
+    """Thread-safe counters of calls and estimated prompt tokens, keyed by provider name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls: Counter = Counter()
+        self.tokens: Counter = Counter()
+
+    def record(self, provider: str, tokens: int = 0) -> int:
+        """Count one call; returns the provider's call number (1-based)."""
+        with self._lock:
+            self.calls[provider] += 1
+            self.tokens[provider] += tokens
+            return self.calls[provider]
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls.clear()
+            self.tokens.clear()
+
+
+def _canned_value(name: str, annotation: Any, claim: str) -> Any:
+    """Canned value for one field of a structured output schema."""
+    args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+    if args and typing.get_origin(annotation) is not list:
+        annotation = args[0]
+    if annotation is bool:
+        return False
+    if annotation in (int, float):
+        return annotation(0)
+    if typing.get_origin(annotation) is list or annotation is list:
+        return [FILLER_SENTENCES[1], FILLER_SENTENCES[3]]
+    if name == "claim_statement":
+        return claim
+    if name == "stance":
+        return "Contradicts"
+    return f"{FILLER_SENTENCES[0]} {FILLER_SENTENCES[2]}"
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Scripted chat model standing in for a real provider.
+
+    The response depends on the tools bound to the model: with ConductResearch
+    it behaves like the supervisor, with tavily_search like a researcher, and
+    without tools it returns canned Markdown of ``answer_words`` words.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    provider: str = "fake-llm"
+    claim: str = "The Great Wall of China is visible from space with the naked eye."
+    latency_seconds: float = 0.0
+    research_topics: int = 2
+    searches_per_agent: int = 2
+    answer_words: int = 300
+    stats: Optional[ProviderStats] = None
+    bound_tool_names: tuple = ()
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-factshield"
+
+    def bind_tools(self, tools, **kwargs):
+        names = tuple(convert_to_openai_tool(tool)["function"]["name"] for tool in tools)
+        return self.model_copy(update={"bound_tool_names": names})
+
+    def with_structured_output(self, schema, **kwargs):
+        def respond(messages) -> BaseModel:
+            self._record(messages)
+            time.sleep(self.latency_seconds)
+            return self._structured(schema)
+
+        async def arespond(messages) -> BaseModel:
+            self._record(messages)
+            await asyncio.sleep(self.latency_seconds)
+            return self._structured(schema)
+
+        return RunnableLambda(respond, afunc=arespond, name=f"{self.provider}-structured")
+
+    def _structured(self, schema) -> BaseModel:
+        return schema(**{
+            name: _canned_value(name, field.annotation, self.claim)
+            for name, field in schema.model_fields.items()
+        })
+
+    def _record(self, messages) -> int:
+        if self.stats is None:
+            return 0
+        prompt = messages if isinstance(messages, list) else [messages]
+        return self.stats.record(self.provider, sum(estimate_tokens(str(getattr(m, "content", m))) for m in prompt))
+
+    def _respond(self, messages: List[BaseMessage]) -> AIMessage:
+        call_number = self._record(messages)
+        call_id = f"call_{self.provider}_{call_number}"
+        topic = next((str(m.content) for m in messages if isinstance(m, HumanMessage)), self.claim)
+
+        if "ConductResearch" in self.bound_tool_names:
+            researched = any(isinstance(m, ToolMessage) and m.name == "ConductResearch" for m in messages)
+            if researched:
+                tool_calls = [{"name": "ResearchComplete", "args": {}, "id": call_id}]
+            else:
+                tool_calls = [
+                    {"name": "ConductResearch", "args": {"research_topic": f"{self.claim} (angle {i + 1})"}, "id": f"{call_id}_{i}"}
+                    for i in range(self.research_topics)
+                ]
+            return AIMessage(content="", tool_calls=tool_calls)
+
+        if "tavily_search" in self.bound_tool_names:
+            searches = sum(1 for m in messages if isinstance(m, AIMessage) and m.tool_calls)
+            if searches < self.searches_per_agent:
+                return AIMessage(content="", tool_calls=[{
+                    "name": "tavily_search",
+                    "args": {"query": f"{topic} evidence {searches + 1}", "max_results": 3, "topic": "general"},
+                    "id": call_id,
+                }])
+
+        return AIMessage(content=self._answer())
+
+    def _answer(self) -> str:
+        words = []
+        i = 0
+        while len(words) < self.answer_words:
+            words.extend(FILLER_SENTENCES[i % len(FILLER_SENTENCES)].split())
+            i += 1
+        return "# Fact-Check Report: Great Wall visibility\n\n" + " ".join(words[:self.answer_words])
+
+    def _with_usage(self, message: AIMessage, messages: List[BaseMessage]) -> AIMessage:
+        input_tokens = sum(estimate_tokens(str(m.content)) for m in messages)
+        output_tokens = estimate_tokens(str(message.content))
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        return message
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency_seconds)
+        message = self._with_usage(self._respond(messages), messages)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency_seconds)
+        message = self._with_usage(self._respond(messages), messages)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency_seconds)
+        yield from self._chunks(self._respond(messages))
+
+    async def _astream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency_seconds)
+        for chunk in self._chunks(self._respond(messages)):
+            yield chunk
+
+    def _chunks(self, message: AIMessage) -> Iterator[ChatGenerationChunk]:
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                for i, call in enumerate(message.tool_calls)
+            ]))
+            return
+        words = str(message.content).split(" ")
+        for i, word in enumerate(words):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+
+
+class FakeTavilyClient:
+    """
+    Tavily client serving recorded search fixtures.
+
+    Exact queries found in the fixture's "responses" map get the recorded
+    response; any other query gets ``results_per_query`` pages rotated from the
+    fixture's "pages" by a stable hash of the query, so related queries
+    overlap the way real search results do.
+    """
+
+    def __init__(self, fixtures_path: Path, latency_seconds: float = 0.0, stats: Optional[ProviderStats] = None):
+        with open(fixtures_path, encoding="utf-8") as f:
+            fixtures = json.load(f)
+        self.responses: Dict[str, dict] = fixtures.get("responses", {})
+        self.pages: List[dict] = fixtures.get("pages", [])
+        self.results_per_query = fixtures.get("results_per_query", 3)
+        self.latency_seconds = latency_seconds
+        self.stats = stats
+
+    def _response(self, query: str, max_results: int, include_raw_content: bool) -> dict:
+        if self.stats is not None:
+            self.stats.record("tavily")
+        if query in self.responses:
+            return self.responses[query]
+
+        offset = int(hashlib.sha256(query.encode("utf-8")).hexdigest(), 16) % max(1, len(self.pages))
+        count = min(max_results, self.results_per_query, len(self.pages))
+        results = []
+        for i in range(count):
+            page = dict(self.pages[(offset + i) % len(self.pages)])
+            if not include_raw_content:
+                page.pop("raw_content", None)
+            results.append(page)
+        return {"query": query, "results": results, "response_time": self.latency_seconds}
+
+    def search(self, query: str, max_results: int = 5, include_raw_content: bool = False, topic: str = "general", **kwargs) -> dict:
+        time.sleep(self.latency_seconds)
+        return self._response(query, max_results, include_raw_content)
+
+
+class FakeAsyncTavilyClient(FakeTavilyClient):
+    """Async variant of FakeTavilyClient."""
+
+    async def search(self, query: str, max_results: int = 5, include_raw_content: bool = False, topic: str = "general", **kwargs) -> dict:
+        await asyncio.sleep(self.latency_seconds)
+        return self._response(query, max_results, include_raw_content)
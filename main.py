@@ -1,52 +1,113 @@
+import argparse
 import asyncio
 import os
 import re
+import uuid
 from datetime import datetime
+from functools import lru_cache
+from typing_extensions import Literal, Optional
 from langchain_core.messages import HumanMessage
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, START, END
+from langgraph.types import Command
 
-from utils import get_today_str, create_compress_llm
+from utils import get_today_str, create_compress_llm, compress_llm_model_id, format_message_content, get_verdict_cache
+from rate_limit import astream_with_retry
+from run_scope import get_run_scope, release_run_scope
+from checkpointing import create_checkpointer, close_checkpointer
+from metrics import instrument, export_run_metrics
+from budget import apply_run_budget
 from prompts import final_report_generation_prompt
 from state_scope import AgentState, AgentInputState
 from factchecker_agent_scope import clarify_fact_request, write_claim_statement
-from factchecker_multi_agent_supervisor import supervisor_agent
+from factchecker_multi_agent_supervisor import get_supervisor_agent
 from niceterminalui import (
     print_banner, print_step, print_success, print_warning, 
     print_info, print_result_box, rich_prompt, print_completion_message,
-    console
+    StreamingResultBox, console
 )
 
 
-writer_model = create_compress_llm()
+from state_scope import AgentState
 
+def check_verdict_cache(state: AgentState) -> Command[Literal["supervisor_subgraph", "__end__"]]:
+    """
+    Verdict cache lookup node.
 
-from state_scope import AgentState
+    Ends the run with the stored report when the same claim statement (or, with
+    VERDICT_CACHE_FUZZY_THRESHOLD set, a near-identical one) was fact-checked
+    within VERDICT_CACHE_TTL_SECONDS; otherwise hands the claim to the supervisor.
+    """
+    verdict_cache = get_verdict_cache()
+    cached = verdict_cache.get(state.get("claim_statement") or "") if verdict_cache else None
+    if cached is None:
+        return Command(goto="supervisor_subgraph")
+
+    age_minutes = (datetime.now().timestamp() - cached["created_at"]) / 60
+    match = "" if cached["similarity"] == 1.0 else f" (similar claim: {cached['claim_statement']})"
+    return Command(
+        goto=END,
+        update={
+            "final_report": cached["final_report"],
+            "notes": cached["notes"],
+            "messages": [f"Fact-check served from cache, verified {age_minutes:.0f} minutes ago{match}"],
+        }
+    )
 
 async def final_report_generation(state: AgentState):
     """
     Final report generation node.
     
-    Synthesizes all fact-checking research findings into a comprehensive verification report
-    and saves it to the final_reports folder
+    Synthesizes all fact-checking research findings into a comprehensive verification report,
+    streaming it to the caller and to a partial file in the final_reports folder as it is
+    generated, then moves the file into place and, when research was complete,
+    stores it in the verdict cache
     """
     
     notes = state.get("notes", [])
     
     findings = "\n".join(notes)
 
+    # Sources are referenced by evidence ID; resolve them from the run's shared evidence store
+    run_scope = get_run_scope()
+    cited_ids = dict.fromkeys(re.findall(r"\bE\d+\b", findings))
+    evidence = run_scope.evidence.format_references(cited_ids or None)
+
     final_report_prompt = final_report_generation_prompt.format(
         research_brief=state.get("claim_statement", ""),
         findings=findings,
+        evidence=evidence or "No sources were registered.",
         date=get_today_str()
     )
     
-    final_report = await writer_model.ainvoke([HumanMessage(content=final_report_prompt)])
-    
-    # Create final_reports directory if it doesn't exist
+    # Stream the report: each chunk is appended to a partial file and emitted as a
+    # custom stream event ({"report_chunk": text}) for the CLI and Streamlit UIs
+    writer = get_stream_writer()
     os.makedirs("final_reports", exist_ok=True)
+    partial_filepath = os.path.join("final_reports", f".report_{uuid.uuid4().hex}.md.partial")
+    chunks = []
+    try:
+        with open(partial_filepath, 'w', encoding='utf-8') as f:
+            report_stream = astream_with_retry(
+                lambda: create_compress_llm().astream([HumanMessage(content=final_report_prompt)]),
+                provider=compress_llm_model_id()
+            )
+            async for chunk in report_stream:
+                text = format_message_content(chunk)
+                if not text:
+                    continue
+                chunks.append(text)
+                f.write(text)
+                f.flush()
+                writer({"report_chunk": text})
+    except BaseException:
+        # Also covers cancellation (CancelledError), e.g. a Streamlit session reset
+        os.remove(partial_filepath)
+        raise
+    final_report = "".join(chunks)
     
     # Extract title from the report (first line that starts with #)
-    report_lines = final_report.content.split('\n')
+    report_lines = final_report.split('\n')
     title = "fact_check_report"
     for line in report_lines:
         if line.strip().startswith('# '):
@@ -60,37 +121,86 @@ async def final_report_generation(state: AgentState):
     
     filename = f"{filename}.md"
     
-    # Save the report
+    # Move the completed report into place
     filepath = os.path.join("final_reports", filename)
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(final_report.content)
+    os.replace(partial_filepath, filepath)
+    
+    # Only verdicts backed by complete research are cached; a report written after
+    # failed or skipped research, or a run budget cut, is not served to repeats of the claim
+    verdict_cache = get_verdict_cache()
+    incomplete_research = state.get("incomplete_research") or []
+    if incomplete_research:
+        print(f"Not caching the verdict, research was incomplete: {'; '.join(incomplete_research)}")
+    elif verdict_cache is not None and state.get("claim_statement"):
+        verdict_cache.set(state["claim_statement"], final_report, notes)
     
+    # The run is over: drop its shared dedup index and evidence store
+    if run_scope.run_id is not None:
+        release_run_scope(run_scope.run_id)
+
     return {
-        "final_report": final_report.content, 
+        "final_report": final_report, 
         "report_filepath": filepath,
         "messages": [f"Fact-check completed! Final report saved to: {filepath}"],
     }
 
-deep_researcher_builder = StateGraph(AgentState, input_schema=AgentInputState)
+def build_agent(checkpointer=None):
+    """Build and compile the full fact-checking workflow.
+
+    Args:
+        checkpointer: Checkpoint saver persisting each completed node under the run's thread_id
+    """
+    deep_researcher_builder = StateGraph(AgentState, input_schema=AgentInputState)
+
+    # Add workflow nodes
+    deep_researcher_builder.add_node("clarify_fact_request", clarify_fact_request)
+    deep_researcher_builder.add_node("write_claim_statement", write_claim_statement)
+    deep_researcher_builder.add_node("check_verdict_cache", check_verdict_cache)
+    deep_researcher_builder.add_node("supervisor_subgraph", get_supervisor_agent())
+    deep_researcher_builder.add_node("final_report_generation", final_report_generation)
+
+    deep_researcher_builder.add_edge(START, "clarify_fact_request")
+    deep_researcher_builder.add_edge("write_claim_statement", "check_verdict_cache")
+    deep_researcher_builder.add_edge("supervisor_subgraph", "final_report_generation")
+    deep_researcher_builder.add_edge("final_report_generation", END)
 
-# Add workflow nodes
-deep_researcher_builder.add_node("clarify_fact_request", clarify_fact_request)
-deep_researcher_builder.add_node("write_claim_statement", write_claim_statement)
-deep_researcher_builder.add_node("supervisor_subgraph", supervisor_agent)
-deep_researcher_builder.add_node("final_report_generation", final_report_generation)
+    # The clarify_fact_request node has conditional routing built-in via Command objects
+    # It will either go to "write_claim_statement" or END based on whether clarification is needed
+    # Likewise check_verdict_cache goes to "supervisor_subgraph", or to END with a cached report
 
-deep_researcher_builder.add_edge(START, "clarify_fact_request")
-deep_researcher_builder.add_edge("write_claim_statement", "supervisor_subgraph")
-deep_researcher_builder.add_edge("supervisor_subgraph", "final_report_generation")
-deep_researcher_builder.add_edge("final_report_generation", END)
+    return deep_researcher_builder.compile(checkpointer=checkpointer, name="factshield")
 
-# The clarify_fact_request node has conditional routing built-in via Command objects
-# It will either go to "write_claim_statement" or END based on whether clarification is needed
+@lru_cache(maxsize=None)
+def get_agent():
+    """Return the compiled workflow with the configured checkpointer, compiling it on first use.
 
-agent = deep_researcher_builder.compile()
+    Must first be called from inside the event loop that runs the workflow,
+    since the SQLite checkpointer binds to it.
+    """
+    return build_agent(create_checkpointer())
+
+async def close_agent():
+    """Close the checkpointer of the compiled workflow, if it was compiled, so the process can exit.
+
+    Must be awaited on the event loop the workflow ran on. The next get_agent()
+    call compiles the workflow again with a new checkpointer.
+    """
+    if get_agent.cache_info().currsize:
+        await close_checkpointer(get_agent().checkpointer)
+        get_agent.cache_clear()
 
+def __getattr__(name: str):
+    if name == "agent":
+        return get_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-async def main():
+
+def new_thread_id(prefix: str = "cli") -> str:
+    """Create a unique thread id for one fact-check run."""
+    return f"{prefix}-{uuid.uuid4().hex[:12]}"
+
+async def main(resume_thread_id: Optional[str] = None):
+    """Interactive CLI. With resume_thread_id, continue an interrupted run from its last checkpoint."""
     # Print beautiful banner
     print_banner(
         title="FactShield",
@@ -100,43 +210,93 @@ async def main():
         subheader2="Evidence-Based Fact Checking"
     )
     
-    thread = {"configurable": {"thread_id": "1", "recursion_limit": 50}}
+    agent = get_agent()
 
-    # Start with initial user input using rich prompt
-    user_input = rich_prompt("What claim would you like me to fact-check?")
-    messages = [HumanMessage(content=user_input)]
+    if resume_thread_id:
+        if agent.checkpointer is None:
+            print_warning("Resuming requires a checkpointer (CHECKPOINTER is set to none)")
+            return
+        thread_id = resume_thread_id
+        snapshot = await agent.aget_state({"configurable": {"thread_id": thread_id}})
+        messages = list(snapshot.values.get("messages", []))
+        if not snapshot.next:
+            if snapshot.values.get("final_report"):
+                print_result_box("Fact-Check Complete", snapshot.values["final_report"])
+            else:
+                print_warning(f"Run {thread_id} has nothing left to resume")
+            return
+        # No new input: the workflow continues from its last completed node
+        current_state = None
+    else:
+        # Start with initial user input using rich prompt
+        user_input = rich_prompt("What claim would you like me to fact-check?")
+        messages = [HumanMessage(content=user_input)]
+        thread_id = new_thread_id()
+        current_state = {"messages": messages}
     
     while True:
         print_step("Starting Fact-Check Workflow", "🔍")
+        print_info(f"Run ID: {thread_id} (resume with: python main.py --resume {thread_id})")
         
-        current_state = {"messages": messages}
+        thread = {"configurable": {"thread_id": thread_id}, "recursion_limit": 50}
+        run_metrics = instrument(thread)
+        run_budget = apply_run_budget(thread)
         final_state = None
+        report_box = None
         
-        # Run the agent workflow
-        async for event in agent.astream(current_state, config=thread):
-            console.print(f"\n[dim]Processing: {list(event.keys())}[/dim]")
-            for node, output in event.items():
-                final_state = output
-                if "messages" in output and output["messages"]:
-                    latest_message = output["messages"][-1]
-                    message_content = latest_message if isinstance(latest_message, str) else latest_message.content
-                    
-                    # Format different node outputs with appropriate styling
-                    if node == "clarify_fact_request":
-                        # Only show message if proceeding (not asking for clarification)
-                        if not message_content.strip().endswith('?'):  # Simple check for questions
-                            print_info(f"Claim Analysis: {message_content}")
-                    elif node == "write_claim_statement":
-                        print_success(f"Fact-Check Brief Generated")
-                        if "claim_statement" in output:
-                            print_info(f"Claim to verify: {output['claim_statement']}")
-                    elif node == "supervisor_subgraph":
-                        print_step("Fact-Checking In Progress", "🔬")
-                    elif node == "final_report_generation":
-                        if "saved to:" in message_content:
-                            print_success(message_content)
-                        else:
+        # Run the agent workflow; report tokens arrive as custom stream events
+        try:
+            async for mode, event in agent.astream(current_state, config=thread, stream_mode=["updates", "custom"]):
+                if mode == "custom":
+                    if "report_chunk" in event:
+                        if report_box is None:
                             print_step("Generating Fact-Check Report", "📝")
+                            report_box = StreamingResultBox("Fact-Check Complete").start()
+                        report_box.append(event["report_chunk"])
+                    continue
+
+                # The report has finished streaming once its node's update arrives
+                if report_box is not None:
+                    report_box.stop()
+                console.print(f"\n[dim]Processing: {list(event.keys())}[/dim]")
+                for node, output in event.items():
+                    # Routing-only nodes (e.g. a verdict cache miss) have no update
+                    if not output:
+                        continue
+                    final_state = output
+                    if "messages" in output and output["messages"]:
+                        latest_message = output["messages"][-1]
+                        message_content = latest_message if isinstance(latest_message, str) else latest_message.content
+                        
+                        # Format different node outputs with appropriate styling
+                        if node == "clarify_fact_request":
+                            # Only show message if proceeding (not asking for clarification)
+                            if not message_content.strip().endswith('?'):  # Simple check for questions
+                                print_info(f"Claim Analysis: {message_content}")
+                        elif node == "write_claim_statement":
+                            print_success(f"Fact-Check Brief Generated")
+                            if "claim_statement" in output:
+                                print_info(f"Claim to verify: {output['claim_statement']}")
+                        elif node == "check_verdict_cache":
+                            print_success(message_content)
+                        elif node == "supervisor_subgraph":
+                            print_step("Fact-Checking In Progress", "🔬")
+                        elif node == "final_report_generation":
+                            if "saved to:" in message_content:
+                                print_success(message_content)
+                            else:
+                                print_step("Generating Fact-Check Report", "📝")
+        finally:
+            if report_box is not None:
+                report_box.stop()
+            metrics_path = export_run_metrics(run_metrics, thread_id)
+            if metrics_path:
+                print_info(f"Run metrics saved to: {metrics_path}")
+            usage = run_budget.usage()
+            print_info(
+                f"Run usage: {usage['input_tokens'] + usage['output_tokens']} tokens, "
+                f"{usage['searches']} searches" + (f", ${usage['cost']:.4f}" if usage["cost"] else "")
+            )
         
         # Check if workflow ended at clarification step
         if final_state and len(final_state.get("messages", [])) > 0:
@@ -149,10 +309,13 @@ async def main():
                 console.print(f"\n[yellow]{last_content}[/yellow]")
                 additional_info = rich_prompt("Please provide additional details")
                 messages.append(HumanMessage(content=additional_info))
+                # Each attempt is a fresh run over the whole conversation
+                thread_id = new_thread_id()
+                current_state = {"messages": messages}
                 continue
             else:
-                # Display final report in a beautiful box
-                if "final_report" in final_state:
+                # Display final report in a beautiful box, unless it was already streamed into one
+                if "final_report" in final_state and report_box is None:
                     print_result_box("Fact-Check Complete", final_state["final_report"])
                 
                 # Show completion message
@@ -163,5 +326,15 @@ async def main():
             break
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Fact-check a claim interactively.")
+    parser.add_argument("--resume", metavar="THREAD_ID", help="Resume an interrupted run from its last checkpoint")
+    args = parser.parse_args()
+
+    async def run_cli():
+        try:
+            await main(resume_thread_id=args.resume)
+        finally:
+            await close_agent()
+
+    asyncio.run(run_cli())
     
\ No newline at end of file
@@ -0,0 +1,391 @@
+"""
+Latency and Token Instrumentation
+
+A LangChain callback handler that records, for every graph of the workflow
+(scoping, supervisor and fact-checker sub-agents):
+
+- how long each node ran (histogram per graph and node),
+- how many calls and tokens each model used (counters per model),
+- how many times each tool ran (counters per tool and status).
+
+Measurements go into MetricsRegistry instances. Each run gets its own
+registry, exported as a JSON summary, and the process-wide registry
+aggregates all runs and can be rendered in the Prometheus text format:
+
+    run_metrics = instrument(config)
+    await agent.ainvoke(state, config=config)
+    export_run_metrics(run_metrics, run_id)
+
+With METRICS_DIR set, export_run_metrics writes ``<run_id>.json`` and a
+cumulative ``factshield.prom`` (suitable for the node_exporter textfile
+collector) to that directory.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing_extensions import Any, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Directory receiving per-run JSON summaries and the Prometheus text file; empty disables export
+metrics_dir = os.getenv("METRICS_DIR", "")
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+NODE_DURATION = "factshield_node_duration_seconds"
+NODE_ERRORS = "factshield_node_errors_total"
+MODEL_DURATION = "factshield_model_duration_seconds"
+MODEL_CALLS = "factshield_model_calls_total"
+MODEL_TOKENS = "factshield_model_tokens_total"
+TOOL_CALLS = "factshield_tool_calls_total"
+PROVIDER_RETRIES = "factshield_provider_retries_total"
+
+_HELP = {
+    NODE_DURATION: "Duration of LangGraph node runs.",
+    NODE_ERRORS: "LangGraph node runs that raised an exception.",
+    MODEL_DURATION: "Duration of chat model calls.",
+    MODEL_CALLS: "Chat model calls, by status.",
+    MODEL_TOKENS: "Tokens reported by chat models, by type (input or output).",
+    TOOL_CALLS: "Tool runs, by status.",
+    PROVIDER_RETRIES: "Provider calls retried after a rate-limit or server error, by provider and status.",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with count, sum, min and max."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_seconds": round(self.sum, 6),
+            "mean_seconds": round(self.sum / self.count, 6) if self.count else 0.0,
+            "min_seconds": round(self.min, 6) if self.count else 0.0,
+            "max_seconds": round(self.max, 6),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe store of labelled counters and histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = defaultdict(lambda: defaultdict(float))
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = defaultdict(dict)
+
+    @staticmethod
+    def _labels(labels: Dict[str, Any]) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        """Add amount to a counter."""
+        with self._lock:
+            self._counters[name][self._labels(labels)] += amount
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Record one observation in a histogram."""
+        key = self._labels(labels)
+        with self._lock:
+            histogram = self._histograms[name].get(key)
+            if histogram is None:
+                histogram = self._histograms[name][key] = Histogram()
+            histogram.observe(value)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def summary(self) -> Dict[str, Any]:
+        """Summarize the metrics as JSON-serializable nodes, models, tools and retries sections.
+
+        Returns:
+            Dictionary with node timings keyed "<graph>/<node>", model calls, tokens
+            and timings keyed by model, tool calls keyed by tool name and provider
+            retries keyed by provider
+        """
+        with self._lock:
+            nodes: Dict[str, Dict[str, Any]] = {}
+            for labels, histogram in self._histograms.get(NODE_DURATION, {}).items():
+                label_map = dict(labels)
+                nodes[f"{label_map['graph']}/{label_map['node']}"] = {**histogram.as_dict(), "errors": 0}
+            for labels, value in self._counters.get(NODE_ERRORS, {}).items():
+                label_map = dict(labels)
+                key = f"{label_map['graph']}/{label_map['node']}"
+                nodes.setdefault(key, {**Histogram().as_dict(), "errors": 0})["errors"] = int(value)
+
+            models: Dict[str, Dict[str, Any]] = defaultdict(
+                lambda: {"calls": 0, "errors": 0, "input_tokens": 0, "output_tokens": 0}
+            )
+            for labels, value in self._counters.get(MODEL_CALLS, {}).items():
+                label_map = dict(labels)
+                models[label_map["model"]]["calls" if label_map["status"] == "ok" else "errors"] += int(value)
+            for labels, value in self._counters.get(MODEL_TOKENS, {}).items():
+                label_map = dict(labels)
+                models[label_map["model"]][f"{label_map['type']}_tokens"] += int(value)
+            for labels, histogram in self._histograms.get(MODEL_DURATION, {}).items():
+                timing = histogram.as_dict()
+                models[dict(labels)["model"]].update(
+                    total_seconds=timing["total_seconds"], mean_seconds=timing["mean_seconds"]
+                )
+
+            tools: Dict[str, Dict[str, int]] = defaultdict(lambda: {"calls": 0, "errors": 0})
+            for labels, value in self._counters.get(TOOL_CALLS, {}).items():
+                label_map = dict(labels)
+                tools[label_map["tool"]]["calls" if label_map["status"] == "ok" else "errors"] += int(value)
+
+            retries: Dict[str, int] = defaultdict(int)
+            for labels, value in self._counters.get(PROVIDER_RETRIES, {}).items():
+                retries[dict(labels)["provider"]] += int(value)
+
+        return {
+            "nodes": dict(sorted(nodes.items(), key=lambda item: -item[1]["total_seconds"])),
+            "models": dict(models),
+            "tools": dict(tools),
+            "retries": dict(retries),
+        }
+
+    def to_json(self, **extra) -> str:
+        """Render the summary as JSON, with extra top-level fields (e.g. run_id)."""
+        return json.dumps({**extra, **self.summary()}, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# HELP {name} {_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(labels)} {int(value) if float(value).is_integer() else value}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# HELP {name} {_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(series.items()):
+                    for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', f'{bound:g}'),))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        f'{key}="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for key, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _model_name(serialized: Optional[dict], metadata: Optional[dict], invocation_params: Optional[dict]) -> str:
+    """Best-effort model name of a chat model run."""
+    metadata = metadata or {}
+    invocation_params = invocation_params or {}
+    name = (
+        metadata.get("ls_model_name")
+        or invocation_params.get("model")
+        or invocation_params.get("model_name")
+    )
+    if not name and serialized:
+        name = serialized.get("name") or (serialized.get("id") or ["unknown"])[-1]
+    return str(name or "unknown")
+
+
+def token_usage(response) -> Tuple[int, int]:
+    """Input and output tokens of an LLMResult, from usage_metadata or the provider's token_usage."""
+    input_tokens = output_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+    if not (input_tokens or output_tokens):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        input_tokens = usage.get("prompt_tokens", 0)
+        output_tokens = usage.get("completion_tokens", 0)
+    return input_tokens, output_tokens
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Callback handler recording node, model and tool metrics into one or more registries.
+
+    A node is labelled with the graph that runs it: the name of its parent run,
+    which is the compiled graph's name (or, for a graph mounted as a node, that
+    node's name).
+    """
+
+    run_inline = True
+
+    def __init__(self, *registries: MetricsRegistry):
+        self.registries = registries or (get_metrics_registry(),)
+        self._lock = threading.Lock()
+        self._chain_names: Dict[Any, str] = {}
+        self._nodes: Dict[Any, Tuple[str, str, float]] = {}
+        self._models: Dict[Any, Tuple[str, float]] = {}
+        self._tools: Dict[Any, str] = {}
+
+    def _inc(self, name: str, amount: float = 1, **labels) -> None:
+        for registry in self.registries:
+            registry.inc(name, amount, **labels)
+
+    def _observe(self, name: str, value: float, **labels) -> None:
+        for registry in self.registries:
+            registry.observe(name, value, **labels)
+
+    # Nodes
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name") or "chain"
+        node = (metadata or {}).get("langgraph_node")
+        with self._lock:
+            self._chain_names[run_id] = name
+            # Only the node's own run, not the runnables nested inside it (nor, for
+            # a graph mounted as a node, the graph's run, which inherits the node metadata)
+            parent_node = self._nodes.get(parent_run_id)
+            if node and name == node and not (parent_node and parent_node[1] == node):
+                graph = self._chain_names.get(parent_run_id, "graph")
+                self._nodes[run_id] = (graph, node, time.perf_counter())
+
+    def _finish_chain(self, run_id, error: bool) -> None:
+        with self._lock:
+            self._chain_names.pop(run_id, None)
+            started = self._nodes.pop(run_id, None)
+        if started is None:
+            return
+        graph, node, start = started
+        self._observe(NODE_DURATION, time.perf_counter() - start, graph=graph, node=node)
+        if error:
+            self._inc(NODE_ERRORS, graph=graph, node=node)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish_chain(run_id, error=False)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish_chain(run_id, error=True)
+
+    # Models
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, invocation_params=None, **kwargs):
+        with self._lock:
+            self._models[run_id] = (_model_name(serialized, metadata, invocation_params), time.perf_counter())
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, invocation_params=None, **kwargs):
+        self.on_chat_model_start(serialized, prompts, run_id=run_id, metadata=metadata, invocation_params=invocation_params)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            started = self._models.pop(run_id, None)
+        if started is None:
+            return
+        model, start = started
+        self._observe(MODEL_DURATION, time.perf_counter() - start, model=model)
+        self._inc(MODEL_CALLS, model=model, status="ok")
+        input_tokens, output_tokens = token_usage(response)
+        if input_tokens:
+            self._inc(MODEL_TOKENS, input_tokens, model=model, type="input")
+        if output_tokens:
+            self._inc(MODEL_TOKENS, output_tokens, model=model, type="output")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            started = self._models.pop(run_id, None)
+        if started is not None:
+            self._inc(MODEL_CALLS, model=started[0], status="error")
+
+    # Tools
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        with self._lock:
+            self._tools[run_id] = kwargs.get("name") or (serialized or {}).get("name") or "tool"
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        with self._lock:
+            tool = self._tools.pop(run_id, None)
+        if tool is not None:
+            self._inc(TOOL_CALLS, tool=tool, status="ok")
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            tool = self._tools.pop(run_id, None)
+        if tool is not None:
+            self._inc(TOOL_CALLS, tool=tool, status="error")
+
+
+_metrics_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Return the process-wide registry aggregating every instrumented run."""
+    return _metrics_registry
+
+
+def instrument(config: dict) -> MetricsRegistry:
+    """Attach a metrics handler for one run to a LangGraph config.
+
+    Args:
+        config: Run config; its "callbacks" list is extended in place
+
+    Returns:
+        Registry receiving this run's metrics (they are also added to the process-wide registry)
+    """
+    run_metrics = MetricsRegistry()
+    config["callbacks"] = list(config.get("callbacks") or []) + [
+        MetricsCallbackHandler(run_metrics, get_metrics_registry())
+    ]
+    return run_metrics
+
+
+def export_run_metrics(run_metrics: MetricsRegistry, run_id: str) -> Optional[Path]:
+    """Write a run's JSON summary and the cumulative Prometheus metrics to METRICS_DIR.
+
+    Args:
+        run_metrics: Registry returned by instrument()
+        run_id: Thread id of the run, used as the JSON file name
+
+    Returns:
+        Path of the JSON summary, or None when METRICS_DIR is not set
+    """
+    if not metrics_dir:
+        return None
+    try:
+        directory = Path(metrics_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        summary_path = directory / f"{run_id}.json"
+        summary_path.write_text(run_metrics.to_json(run_id=run_id), encoding="utf-8")
+        # Write then rename, so a scraper never reads a partial file
+        prom_path = directory / "factshield.prom"
+        partial_path = prom_path.with_suffix(".prom.partial")
+        partial_path.write_text(get_metrics_registry().to_prometheus(), encoding="utf-8")
+        os.replace(partial_path, prom_path)
+        return summary_path
+    except OSError as e:
+        print(f"Failed to export metrics for run {run_id}: {e}")
+        return None
@@ -14,6 +14,7 @@ from rich.table import Table
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeElapsedColumn
 from rich.prompt import Prompt, Confirm
 from rich.align import Align
+from rich.live import Live
 from rich.box import ROUNDED, DOUBLE, HEAVY
 import time
 
@@ -129,6 +130,55 @@ def print_result_box(title, content):
     ))
 
 
+
+class StreamingResultBox:
+    """Result box whose content is rendered progressively while text streams in
+    
+    Uses Rich Live to redraw the box as chunks arrive; the full content is
+    printed when the box is stopped.
+    
+    Args:
+        title (str): Title to display in the box header
+    """
+    
+    def __init__(self, title):
+        self.title = title
+        self.content = ""
+        self._live = None
+    
+    def _render(self):
+        return Panel(
+            self.content,
+            title=f"[bold magenta]{self.title}[/bold magenta]",
+            box=ROUNDED,
+            padding=(1, 2)
+        )
+    
+    def start(self):
+        """Start rendering the box; returns self"""
+        console.print()
+        self._live = Live(self._render(), console=console, refresh_per_second=8)
+        self._live.start()
+        return self
+    
+    def append(self, text):
+        """Append streamed text to the box content"""
+        self.content += text
+        if self._live is not None:
+            self._live.update(self._render())
+    
+    def stop(self):
+        """Stop live rendering, leaving the final box on screen (safe to call twice)"""
+        if self._live is not None:
+            self._live.stop()
+            self._live = None
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+
 def create_interactive_prompt(question, colors=Colors):
     """Create a beautiful interactive prompt for user input (legacy version)
     
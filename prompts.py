@@ -131,11 +131,36 @@ Guidelines:
 
 Output:
 ```json
-{
+{{
     "summary": "Summary of evidence from the page",
     "stance": "Supports | Contradicts | Mixed | Unclear",
     "key_excerpts": "First key quote, Second key quote, ..."
-}
+}}
+```
+"""
+
+combine_webpage_summaries_prompt = """
+You are merging partial summaries of different sections of the same webpage, retrieved during fact-checking.
+Your goal is to produce one summary that preserves all **evidence for or against the claim**.
+
+Here are the section summaries, in page order:
+<partial_summaries>
+{partial_summaries}
+</partial_summaries>
+
+Guidelines:
+1. Keep every fact, quote, statistic, and official statement; drop repetition only.
+2. Keep relevant dates, names, locations, organizations.
+3. Select up to 5 of the most important key excerpts across all sections, verbatim.
+4. Decide one overall stance: Supports, Contradicts, Mixed (sections disagree), or Unclear.
+
+Output:
+```json
+{{
+    "summary": "Summary of evidence from the page",
+    "stance": "Supports | Contradicts | Mixed | Unclear",
+    "key_excerpts": "First key quote, Second key quote, ..."
+}}
 ```
 """
 
@@ -158,8 +183,8 @@ Today's date is {date}.
    - **Mixed/Unclear Evidence**
    - **Sources**
 2. Keep verbatim wording for critical evidence.
-3. Use inline citations [1], [2], [3].
-4. Number sources sequentially.
+3. Cite sources inline by the evidence IDs shown in the search results, e.g. [E1], [E4].
+4. Under **Sources**, list each cited evidence ID once; do not renumber them.
 """
 
 compress_research_human_message = """All above messages are about research conducted by an AI Researcher for the following **fact-checking claim**:
@@ -173,7 +198,7 @@ CRITICAL REQUIREMENTS:
 - DO NOT lose any details, facts, quotes, names, dates, or statistics
 - DO NOT filter out information that may support or contradict the claim
 - Explicitly organize evidence into **For, Against, or Mixed/Unclear**
-- Keep inline citations [1], [2], [3] exactly as found
+- Keep evidence ID citations such as [E1], [E2] exactly as found
 - Include ALL sources, even if they repeat the same fact
 - Organize the cleaned findings in a way that clearly shows where the evidence stands relative to the claim
 
@@ -181,6 +206,52 @@ The cleaned findings will be used for the final fact-checking verdict, so compre
 """
 
 
+running_summary_update_prompt = """You are keeping a running record of the research conducted by an AI Researcher for the following **fact-checking claim**:
+
+CLAIM: {research_topic}
+Today's date is {date}.
+
+<Current Summary>
+{running_summary}
+</Current Summary>
+
+<New Research>
+{new_research}
+</New Research>
+
+Merge the new research into the current summary and return the updated summary.
+
+<Guidelines>
+1. Keep the structure of compressed research findings:
+   - **List of Queries & Searches Made**
+   - **Evidence For**
+   - **Evidence Against**
+   - **Mixed/Unclear Evidence**
+   - **Sources**
+2. Keep verbatim wording for quotes, statistics, names and dates; never drop evidence already in the summary.
+3. Keep evidence ID citations such as [E1], [E2] exactly as found; do not renumber them.
+4. Remove only duplicate or irrelevant information.
+</Guidelines>
+
+Return only the updated summary.
+"""
+
+compress_research_finalize_prompt = """Below is the running summary of research conducted by an AI Researcher for the following **fact-checking claim**, followed by the researcher's final messages that are not yet part of it:
+
+CLAIM: {research_topic}
+Today's date is {date}.
+
+<Running Summary>
+{running_summary}
+</Running Summary>
+
+<Final Messages>
+{final_messages}
+</Final Messages>
+
+Produce the final cleaned research findings: fold in anything new from the final messages, keep the **List of Queries & Searches Made / Evidence For / Evidence Against / Mixed/Unclear Evidence / Sources** structure, preserve all quotes, statistics and evidence ID citations ([E1], [E2]) exactly, and do not drop any evidence from the running summary.
+"""
+
 lead_researcher_prompt = """You are a fact-checking supervisor. Your job is to conduct verification research by calling the "ConductResearch" tool. 
 For context, today's date is {date}.
 
@@ -261,6 +332,13 @@ final_report_generation_prompt = """Based on the research conducted, create a fa
 {findings}
 </Findings>
 
+<Evidence>
+{evidence}
+</Evidence>
+
+The findings cite sources by evidence IDs such as [E3]. The Evidence section lists the title, URL and stance for each ID.
+Renumber the sources you cite as [1], [2], [3] in your report.
+
 Your report must:
 1. State clearly if the claim is **True, False, Misleading, or Unverified**.
 2. Provide supporting and opposing evidence.
@@ -0,0 +1,222 @@
+"""
+Provider Rate Limiting and Retries
+
+Concurrent sub-agents share the same model and search quotas. This module
+keeps one token-bucket rate limiter per provider (and model), shared by every
+caller in the process, and retries calls that fail with a rate-limit (429) or
+server (5xx) error using exponential backoff with full jitter.
+
+Limits are given in requests per minute by RATE_LIMITS, a comma-separated list
+of ``provider[:model]=rpm`` entries, e.g.:
+
+    RATE_LIMITS=tavily=100,google_genai:gemini-2.5-flash=1000,openai=500
+
+A provider:model entry takes precedence over a provider entry and gets its own
+bucket; models limited by a provider entry share the provider's bucket. Anything
+not listed uses RATE_LIMIT_DEFAULT_RPM (0 means unlimited), in one bucket per
+provider.
+
+Chat models receive their limiter through LangChain's ``rate_limiter``
+parameter (see utils._init_chat_model), so it applies to every invoke, stream,
+tool-bound and structured-output call. Search calls acquire the "tavily"
+limiter explicitly.
+"""
+
+import asyncio
+import os
+import random
+import time
+from functools import lru_cache
+from typing_extensions import AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+
+from langchain_core.rate_limiters import InMemoryRateLimiter
+
+from metrics import PROVIDER_RETRIES, get_metrics_registry
+
+T = TypeVar("T")
+
+
+def _parse_rate_limits(spec: str) -> Dict[str, float]:
+    limits = {}
+    for entry in spec.split(","):
+        key, _, value = entry.strip().partition("=")
+        if not key or not value:
+            continue
+        try:
+            limits[key.strip().lower()] = float(value)
+        except ValueError:
+            print(f"Ignoring invalid RATE_LIMITS entry: {entry.strip()}")
+    return limits
+
+
+# Requests per minute by "provider" or "provider:model"
+rate_limits = _parse_rate_limits(os.getenv("RATE_LIMITS", "tavily=100"))
+rate_limit_default_rpm = float(os.getenv("RATE_LIMIT_DEFAULT_RPM", "0"))
+
+# Requests that may be sent back to back before the rate applies
+rate_limit_burst = int(os.getenv("RATE_LIMIT_BURST", "5"))
+
+# Retries of a call failing with 429/5xx, and the backoff bounds in seconds
+provider_max_retries = int(os.getenv("PROVIDER_MAX_RETRIES", "4"))
+retry_base_delay = float(os.getenv("RETRY_BASE_DELAY_SECONDS", "1"))
+retry_max_delay = float(os.getenv("RETRY_MAX_DELAY_SECONDS", "30"))
+
+
+def rate_limit_key(provider: str, model: Optional[str] = None) -> str:
+    """Key of the limit that applies to a provider (and model): "provider:model" if listed, else "provider"."""
+    provider = provider.lower()
+    if model and f"{provider}:{model.lower()}" in rate_limits:
+        return f"{provider}:{model.lower()}"
+    return provider
+
+
+def requests_per_minute(provider: str, model: Optional[str] = None) -> float:
+    """Configured request rate of a provider (and model); 0 means unlimited."""
+    return rate_limits.get(rate_limit_key(provider, model), rate_limit_default_rpm)
+
+
+def get_rate_limiter(provider: str, model: Optional[str] = None) -> Optional[InMemoryRateLimiter]:
+    """Return the process-wide rate limiter of a provider (and model), or None if unlimited.
+
+    Args:
+        provider: Provider name, e.g. "google_genai" or "tavily"
+        model: Model name, for per-model limits
+
+    Returns:
+        Token-bucket rate limiter shared by every caller subject to the same limit
+        entry, e.g. every model of a provider limited as a whole
+    """
+    return _rate_limiter(rate_limit_key(provider, model))
+
+
+@lru_cache(maxsize=None)
+def _rate_limiter(key: str) -> Optional[InMemoryRateLimiter]:
+    rpm = rate_limits.get(key, rate_limit_default_rpm)
+    if rpm <= 0:
+        return None
+    requests_per_second = rpm / 60
+    rate_limiter = InMemoryRateLimiter(
+        requests_per_second=requests_per_second,
+        # Poll often enough for the configured rate, without busy-waiting
+        check_every_n_seconds=min(0.1, 1 / requests_per_second / 4),
+        max_bucket_size=max(1, rate_limit_burst),
+    )
+    # The bucket starts empty; start it full so the first burst is not delayed
+    rate_limiter.available_tokens = rate_limiter.max_bucket_size
+    return rate_limiter
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    """HTTP status of a provider error, when it can be determined."""
+    for status in (
+        getattr(error, "status_code", None),
+        getattr(error, "code", None),
+        getattr(getattr(error, "response", None), "status_code", None),
+    ):
+        if isinstance(status, int) and 100 <= status < 600:
+            return status
+    # SDK exceptions raised for 429 responses without carrying the status
+    name = type(error).__name__
+    if name in ("RateLimitError", "UsageLimitExceededError", "TavilyKeylessLimitError", "ResourceExhausted", "TooManyRequests"):
+        return 429
+    if name in ("InternalServerError", "ServiceUnavailable", "BadGateway", "GatewayTimeout"):
+        return 503
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether a failed provider call should be retried (rate limited or server error)."""
+    status = error_status(error)
+    return status is not None and (status == 429 or 500 <= status < 600)
+
+
+def backoff_delay(attempt: int, error: Optional[BaseException] = None) -> float:
+    """Seconds to wait before retry number ``attempt`` (1-based).
+
+    Honors a Retry-After hint from the provider; otherwise uses exponential
+    backoff with full jitter, so concurrent callers do not retry in lockstep.
+    """
+    retry_after = getattr(error, "retry_after_seconds", None)
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if retry_after is None and headers is not None:
+        retry_after = headers.get("retry-after")
+    try:
+        if retry_after is not None:
+            return min(retry_max_delay, float(retry_after)) + random.uniform(0, retry_base_delay)
+    except (TypeError, ValueError):
+        pass
+    return random.uniform(0, min(retry_max_delay, retry_base_delay * 2 ** (attempt - 1)))
+
+
+def _should_retry(error: Exception, attempt: int, provider: str, max_retries: int) -> Optional[float]:
+    """Return the delay before retrying a failed call, or None to give up."""
+    if attempt > max_retries or not is_retryable(error):
+        return None
+    delay = backoff_delay(attempt, error)
+    get_metrics_registry().inc(PROVIDER_RETRIES, provider=provider, status=str(error_status(error)))
+    print(f"{provider} call failed ({error_status(error)}: {str(error)[:200]}); retry {attempt}/{max_retries} in {delay:.1f}s")
+    return delay
+
+
+async def aretry(call: Callable[[], Awaitable[T]], provider: str, max_retries: Optional[int] = None) -> T:
+    """Await ``call()``, retrying rate-limited and server errors with jittered exponential backoff.
+
+    Args:
+        call: Zero-argument function returning a fresh awaitable for each attempt
+        provider: Provider name, for logs and the retry counter
+        max_retries: Retries after the first attempt (defaults to PROVIDER_MAX_RETRIES)
+
+    Returns:
+        Result of the first successful attempt
+    """
+    max_retries = provider_max_retries if max_retries is None else max_retries
+    attempt = 0
+    while True:
+        try:
+            return await call()
+        except Exception as e:
+            attempt += 1
+            delay = _should_retry(e, attempt, provider, max_retries)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+
+
+def retry(call: Callable[[], T], provider: str, max_retries: Optional[int] = None) -> T:
+    """Synchronous variant of aretry."""
+    max_retries = provider_max_retries if max_retries is None else max_retries
+    attempt = 0
+    while True:
+        try:
+            return call()
+        except Exception as e:
+            attempt += 1
+            delay = _should_retry(e, attempt, provider, max_retries)
+            if delay is None:
+                raise
+            time.sleep(delay)
+
+
+async def astream_with_retry(
+    stream: Callable[[], AsyncIterator[T]], provider: str, max_retries: Optional[int] = None
+) -> AsyncIterator[T]:
+    """Iterate ``stream()``, retrying like aretry as long as no chunk has been yielded yet.
+
+    Once output has been yielded a failure is raised, since retrying would
+    repeat the chunks already delivered.
+    """
+    max_retries = provider_max_retries if max_retries is None else max_retries
+    attempt = 0
+    while True:
+        started = False
+        try:
+            async for chunk in stream():
+                started = True
+                yield chunk
+            return
+        except Exception as e:
+            attempt += 1
+            delay = None if started else _should_retry(e, attempt, provider, max_retries)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
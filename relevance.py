@@ -0,0 +1,207 @@
+"""
+Lexical Relevance Utilities
+
+This module holds the cheap, local text processing used before any LLM call:
+rough token estimation, splitting long webpages into token-bounded windows,
+BM25 scoring of text against the search query and the claim under check, and
+the pre-filter that drops or truncates low-relevance search results.
+"""
+
+import math
+import re
+from collections import Counter
+from typing_extensions import List, Sequence, Tuple
+
+# Rough characters-per-token ratio for English prose, good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by for from has have he her his i in is it its of on or our
+she that the their them they this to was we were what when where which who will with you your
+""".split())
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in text without a tokenizer."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of text with common stopwords removed."""
+    return [word for word in _WORD_RE.findall(text.lower()) if word not in STOPWORDS]
+
+
+def split_into_windows(text: str, max_tokens: int) -> List[str]:
+    """Split text into consecutive windows of at most max_tokens estimated tokens.
+
+    Paragraph boundaries are kept whenever possible; paragraphs larger than a
+    window are cut at whitespace.
+
+    Args:
+        text: Text to split
+        max_tokens: Token budget of a single window
+
+    Returns:
+        List of windows covering the whole text, in order
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    windows: List[str] = []
+    current: List[str] = []
+    current_chars = 0
+
+    def flush():
+        nonlocal current, current_chars
+        if current:
+            windows.append("\n\n".join(current))
+        current, current_chars = [], 0
+
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+
+        while len(paragraph) > max_chars:
+            flush()
+            cut = paragraph.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            windows.append(paragraph[:cut])
+            paragraph = paragraph[cut:].strip()
+
+        if current_chars + len(paragraph) > max_chars:
+            flush()
+        current.append(paragraph)
+        current_chars += len(paragraph) + 2
+
+    flush()
+    return windows
+
+
+def bm25_scores(query: str, documents: Sequence[str], k1: float = 1.5, b: float = 0.75) -> List[float]:
+    """Score documents against a query with Okapi BM25.
+
+    Document frequencies are computed over the given documents only, which is
+    what we want when ranking the windows of one page or the results of one search.
+
+    Args:
+        query: Query text, e.g. the search query plus the claim
+        documents: Texts to score
+        k1: Term frequency saturation parameter
+        b: Length normalization parameter
+
+    Returns:
+        One score per document, in order
+    """
+    query_terms = set(tokenize(query))
+    tokenized = [tokenize(document) for document in documents]
+    if not query_terms or not tokenized:
+        return [0.0] * len(documents)
+
+    n_documents = len(tokenized)
+    average_length = sum(len(tokens) for tokens in tokenized) / n_documents or 1.0
+    document_frequency = Counter(term for tokens in tokenized for term in set(tokens) & query_terms)
+
+    scores = []
+    for tokens in tokenized:
+        term_counts = Counter(tokens)
+        length_norm = k1 * (1 - b + b * len(tokens) / average_length)
+        score = 0.0
+        for term in query_terms:
+            tf = term_counts.get(term, 0)
+            if not tf:
+                continue
+            df = document_frequency[term]
+            idf = math.log(1 + (n_documents - df + 0.5) / (df + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + length_norm)
+        scores.append(score)
+    return scores
+
+
+def select_relevant_windows(windows: List[str], relevance_text: str, max_windows: int) -> List[str]:
+    """Keep the windows most relevant to relevance_text, in their original order.
+
+    Args:
+        windows: Windows of a single page
+        relevance_text: Text describing what we are looking for (query and claim)
+        max_windows: Maximum number of windows to keep
+
+    Returns:
+        Selected windows in page order
+    """
+    if len(windows) <= max_windows:
+        return windows
+
+    scores = bm25_scores(relevance_text, windows)
+    # Stable ranking: ties keep earlier windows, which tend to carry the lede
+    ranked = sorted(range(len(windows)), key=lambda i: (-scores[i], i))
+    keep = sorted(ranked[:max_windows])
+    return [windows[i] for i in keep]
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """Split text into non-empty paragraphs."""
+    return [paragraph.strip() for paragraph in re.split(r"\n\s*\n", text) if paragraph.strip()]
+
+
+def filter_search_results(
+    unique_results: dict,
+    relevance_text: str,
+    min_relative_score: float = 0.2,
+    max_paragraphs: int = 8,
+) -> Tuple[dict, List[dict]]:
+    """Drop or truncate low-relevance search results before LLM summarization.
+
+    Each result's title and Tavily snippet are scored with BM25 against the
+    query and claim. Results scoring below ``min_relative_score`` times the best
+    score are marginal: if some paragraphs of their raw content match the query
+    they are kept with only those paragraphs, otherwise they are dropped. When
+    nothing matches at all there is no signal to rank on and every result is kept.
+
+    Args:
+        unique_results: Dictionary mapping URLs to search results
+        relevance_text: Search query and claim
+        min_relative_score: Fraction of the best snippet score a result needs to be kept whole
+        max_paragraphs: Maximum matching paragraphs kept from a marginal result
+
+    Returns:
+        Tuple of (kept results in original order, skipped entries with url, title and reason)
+    """
+    urls = list(unique_results)
+    snippet_scores = bm25_scores(
+        relevance_text,
+        [f"{unique_results[url].get('title', '')} {unique_results[url].get('content', '')}" for url in urls]
+    )
+    best_score = max(snippet_scores, default=0.0)
+    if best_score <= 0:
+        return dict(unique_results), []
+
+    kept, skipped = {}, []
+    for url, score in zip(urls, snippet_scores):
+        result = unique_results[url]
+        if score >= min_relative_score * best_score:
+            kept[url] = result
+            continue
+
+        paragraphs = split_paragraphs(result.get("raw_content") or "")
+        paragraph_scores = bm25_scores(relevance_text, paragraphs)
+        matching = sorted(
+            (i for i, paragraph_score in enumerate(paragraph_scores) if paragraph_score > 0),
+            key=lambda i: -paragraph_scores[i]
+        )[:max_paragraphs]
+
+        if matching:
+            kept[url] = {**result, "raw_content": "\n\n".join(paragraphs[i] for i in sorted(matching))}
+            skipped.append({
+                "url": url,
+                "title": result.get("title", ""),
+                "reason": f"low relevance, kept {len(matching)} of {len(paragraphs)} paragraphs",
+            })
+        else:
+            skipped.append({
+                "url": url,
+                "title": result.get("title", ""),
+                "reason": "low relevance, dropped",
+            })
+
+    return kept, skipped
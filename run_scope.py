@@ -0,0 +1,87 @@
+"""
+Per-Run Shared State
+
+A claim run spans the scope graph, the supervisor and every fact-checker
+sub-agent it launches. This module keeps process-local state shared by all of
+them for the duration of one run, looked up from the LangGraph config
+(``configurable.run_id``, falling back to ``configurable.thread_id``). With
+persistent checkpointing, a run's evidence store is also archived so that a
+resumed run keeps its evidence IDs.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing_extensions import Optional
+
+from langchain_core.runnables import RunnableConfig, ensure_config
+
+from dedup import NearDuplicateIndex
+from evidence_store import EvidenceStore
+from checkpointing import get_evidence_archive
+
+# Number of recent runs whose shared state is kept in memory
+MAX_RUN_SCOPES = 128
+
+
+@dataclass
+class RunScope:
+    """State shared by every agent working on the same claim run."""
+    run_id: Optional[str]
+    dedup: NearDuplicateIndex = field(default_factory=NearDuplicateIndex)
+    evidence: EvidenceStore = field(default_factory=EvidenceStore)
+
+
+_run_scopes: "OrderedDict[str, RunScope]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _create_evidence_store(run_id: str) -> EvidenceStore:
+    """Create a run's evidence store, restoring and archiving its entries when checkpoints persist."""
+    archive = get_evidence_archive()
+    if archive is None:
+        return EvidenceStore()
+    evidence = EvidenceStore(on_add=lambda entry: archive.append(run_id, entry))
+    evidence.restore(archive.load(run_id))
+    return evidence
+
+
+def get_run_id(config: Optional[RunnableConfig] = None) -> Optional[str]:
+    """Return the id of the current run from the (ambient) LangGraph config."""
+    configurable = ensure_config(config).get("configurable", {})
+    run_id = configurable.get("run_id") or configurable.get("thread_id")
+    return str(run_id) if run_id is not None else None
+
+
+def get_run_scope(config: Optional[RunnableConfig] = None) -> RunScope:
+    """Return the shared state of the current run.
+
+    Outside a configured run (no run_id or thread_id), a fresh, unshared scope
+    is returned so that unrelated calls never see each other's state.
+
+    Args:
+        config: Runnable config; defaults to the config of the currently executing runnable
+
+    Returns:
+        RunScope of the current run
+    """
+    run_id = get_run_id(config)
+    if run_id is None:
+        return RunScope(run_id=None)
+
+    with _lock:
+        scope = _run_scopes.get(run_id)
+        if scope is None:
+            scope = RunScope(run_id=run_id, evidence=_create_evidence_store(run_id))
+            _run_scopes[run_id] = scope
+            while len(_run_scopes) > MAX_RUN_SCOPES:
+                _run_scopes.popitem(last=False)
+        else:
+            _run_scopes.move_to_end(run_id)
+        return scope
+
+
+def release_run_scope(run_id: str) -> None:
+    """Forget the shared state of a finished run."""
+    with _lock:
+        _run_scopes.pop(run_id, None)
@@ -0,0 +1,97 @@
+"""
+Research Scheduler for the Multi-Agent Supervisor
+
+This module bounds how many fact-checker sub-agents run at the same time across
+every claim processed by the process. Sub-agent runs beyond the limit wait in a
+FIFO queue, and each run is subject to a timeout so a stuck researcher cannot
+hold a slot forever.
+"""
+
+import asyncio
+import os
+import weakref
+from typing_extensions import Any, Awaitable, Callable, List, Optional
+
+
+class ResearchTimeoutError(Exception):
+    """Raised when a sub-agent run exceeds its time limit."""
+
+
+class ResearchScheduler:
+    """
+    Semaphore-bounded pool for sub-agent runs.
+
+    The limit is global to the process: every supervisor shares the same
+    scheduler, so concurrent claims compete for the same slots. Waiting runs
+    are admitted in arrival order as slots free up.
+    """
+
+    def __init__(self, max_concurrent: int, timeout_seconds: Optional[float] = None):
+        self.max_concurrent = max_concurrent
+        self.timeout_seconds = timeout_seconds
+        self.active = 0
+        self.queued = 0
+        # asyncio primitives are bound to one event loop, so keep one semaphore per loop
+        self._semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrent)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def run(self, coro_factory: Callable[[], Awaitable[Any]], timeout_seconds: Optional[float] = None) -> Any:
+        """Run one sub-agent once a slot is free.
+
+        Args:
+            coro_factory: Callable creating the coroutine to run, invoked only once admitted
+            timeout_seconds: Per-run timeout overriding the scheduler default
+
+        Returns:
+            The coroutine's result
+
+        Raises:
+            ResearchTimeoutError: If the run does not finish in time
+        """
+        timeout = timeout_seconds if timeout_seconds is not None else self.timeout_seconds
+
+        self.queued += 1
+        try:
+            await self._semaphore().acquire()
+        finally:
+            self.queued -= 1
+
+        self.active += 1
+        try:
+            return await asyncio.wait_for(coro_factory(), timeout=timeout)
+        except asyncio.TimeoutError as e:
+            raise ResearchTimeoutError(f"Research timed out after {timeout:.0f} seconds") from e
+        finally:
+            self.active -= 1
+            self._semaphore().release()
+
+    async def run_all(self, coro_factories: List[Callable[[], Awaitable[Any]]]) -> List[Any]:
+        """Run several sub-agents through the pool.
+
+        Args:
+            coro_factories: Callables creating the coroutines to run
+
+        Returns:
+            Results in submission order; failed runs are returned as their exception
+        """
+        return await asyncio.gather(
+            *(self.run(factory) for factory in coro_factories),
+            return_exceptions=True
+        )
+
+
+def _optional_float(value: Optional[str]) -> Optional[float]:
+    return float(value) if value else None
+
+
+research_scheduler = ResearchScheduler(
+    max_concurrent=int(os.getenv("MAX_CONCURRENT_RESEARCHERS", "3")),
+    timeout_seconds=_optional_float(os.getenv("RESEARCHER_TIMEOUT_SECONDS", "600")),
+)
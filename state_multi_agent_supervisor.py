@@ -27,6 +27,7 @@ class SupervisorState(TypedDict):
     notes: Annotated[list[str], operator.add]
     research_iterations: int
     raw_notes: Annotated[list[str], operator.add]
+    incomplete_research: Annotated[list[str], operator.add] # why findings are partial (errors, skipped topics, run budget)
 
 @tool
 class ConductResearch(BaseModel):
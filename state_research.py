@@ -9,11 +9,17 @@ class FactCheckerState(TypedDict):
     """
     State for the fact-checking agent containing conversation history and metadata.
 
-    Tracks the claim being fact-checked, iteration count for limiting tool calls,
-    compressed evidence summaries, and raw evidence notes for detailed analysis.
+    Tracks the claim being fact-checked, the budget counters (tool rounds,
+    searches, tokens, start time) used to stop runaway research loops, the id
+    keying its running summary of research so far, compressed evidence summaries, and raw
+    evidence notes for detailed analysis.
     """
     tool_call_iterations: int
+    search_calls: int
+    tokens_used: Annotated[int, operator.add]
+    started_at: float
     claim_statement: Optional[str]
+    research_id: str
     compressed_research: str
     raw_notes: Annotated[List[str], operator.add]
     fact_checker_messages: Annotated[Sequence[BaseMessage], add_messages]
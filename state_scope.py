@@ -23,6 +23,7 @@ class AgentState(MessagesState):
     supervisor_messages: Annotated[Sequence[BaseMessage], add_messages]
     raw_notes: Annotated[list[str], operator.add]
     notes: Annotated[list[str], operator.add] # notes ready for report generation
+    incomplete_research: Annotated[list[str], operator.add] # why the notes are partial; such verdicts are not cached
     final_report: str
 
 class ClarifyClaim(BaseModel):
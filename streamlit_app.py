@@ -1,13 +1,21 @@
-import asyncio
+import atexit
+import os
 import time
+import uuid
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 import streamlit as st
 from langchain_core.messages import HumanMessage
 
 # Import the workflow components from main.py
-from main import agent
+from main import get_agent, close_agent
+from background import BackgroundEventLoop, Job, JobManager
+from metrics import instrument, export_run_metrics
+from budget import apply_run_budget
+
+# Seconds between reruns while a session polls its running job
+job_poll_interval = float(os.getenv("STREAMLIT_POLL_SECONDS", "0.5"))
 
 # Configure Streamlit page
 st.set_page_config(
@@ -86,6 +94,36 @@ def display_header():
     </div>
     """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_event_loop() -> BackgroundEventLoop:
+    """Persistent event loop that runs workflows for every session."""
+    return BackgroundEventLoop(name="factshield-streamlit-loop")
+
+@st.cache_resource
+def get_workflow_agent():
+    """Compiled fact-checking workflow, shared by every session of the server process.
+
+    Compiled on the background loop, which its checkpointer binds to. The
+    checkpointer's database connection is closed on that loop when the server exits.
+    """
+    async def compile_agent():
+        return get_agent()
+    agent = get_event_loop().run(compile_agent())
+    atexit.register(close_workflow_agent)
+    return agent
+
+def close_workflow_agent():
+    """Close the shared workflow's checkpointer on the background loop at server shutdown."""
+    try:
+        get_event_loop().run(close_agent(), timeout=5)
+    except Exception as e:
+        print(f"Failed to close the checkpointer: {e}")
+
+@st.cache_resource
+def get_job_manager() -> JobManager:
+    """Server-side job manager running the workflows of every session in the background."""
+    return JobManager(get_event_loop())
+
 def initialize_session_state():
     """Initialize Streamlit session state variables."""
     if 'workflow_state' not in st.session_state:
@@ -100,6 +138,19 @@ def initialize_session_state():
         st.session_state.workflow_history = []
     if 'processing' not in st.session_state:
         st.session_state.processing = False
+    if 'session_id' not in st.session_state:
+        # Isolates this browser session's jobs and checkpoint threads from other users
+        st.session_state.session_id = uuid.uuid4().hex
+    if 'run_count' not in st.session_state:
+        st.session_state.run_count = 0
+    if 'job_id' not in st.session_state:
+        st.session_state.job_id = None
+    if 'job_cursor' not in st.session_state:
+        st.session_state.job_cursor = 0
+    if 'job_final_state' not in st.session_state:
+        st.session_state.job_final_state = None
+    if 'report_text' not in st.session_state:
+        st.session_state.report_text = ""
 
 def add_workflow_step(step_name: str, status: str, message: str):
     """Add a step to the workflow history."""
@@ -138,126 +189,191 @@ def display_workflow_history():
             </div>
             """, unsafe_allow_html=True)
 
-async def run_fact_check_workflow(messages_list: list, step_container, progress_container) -> Dict[str, Any]:
+async def stream_workflow_events(agent, messages_list: list, thread: dict, job: Job) -> None:
     """
-    Run the fact-checking workflow asynchronously.
+    Run the fact-checking workflow as a background job.
+
+    Streamlit APIs may only be used from the script thread, so each streamed
+    event is published on the job and rendered by the session when it polls.
     
     Args:
+        agent: Compiled fact-checking workflow
         messages_list: List of messages (strings) from the conversation
-        step_container: Streamlit container for step updates
-        progress_container: Streamlit container for progress messages
-        
-    Returns:
-        Dictionary containing the final workflow state
+        thread: LangGraph config for the run
+        job: Job receiving (stream mode, event) pairs for node updates and report chunks
     """
-    thread = {"configurable": {"thread_id": "streamlit_session", "recursion_limit": 50}}
     # Convert string messages to HumanMessage objects - matching main.py pattern
     messages = [HumanMessage(content=msg) for msg in messages_list]
-    current_state = {"messages": messages}
-    final_state = None
-    
+    run_metrics = instrument(thread)
+    apply_run_budget(thread)
     try:
-        add_workflow_step("Workflow Started", "processing", "Starting fact-check workflow...")
-        progress_container.info("🚀 Starting fact-check workflow...")
-        
-        # Update display
-        with step_container.container():
-            display_workflow_history()
+        async for mode, event in agent.astream({"messages": messages}, config=thread, stream_mode=["updates", "custom"]):
+            job.publish((mode, event))
+    finally:
+        export_run_metrics(run_metrics, thread["configurable"]["thread_id"])
+
+def start_fact_check_job(messages_list: list) -> str:
+    """
+    Start the fact-checking workflow for this session on the server-side job manager.
+
+    The job keeps running across Streamlit reruns; the session polls it with
+    poll_fact_check_job().
+    
+    Args:
+        messages_list: List of messages (strings) from the conversation
         
-        # Run the agent workflow - mirroring main.py logic
-        async for event in agent.astream(current_state, config=thread):
-            # Show which node is being processed
-            node_names = list(event.keys())
-            if node_names:
-                add_workflow_step("Processing", "processing", f"Running: {', '.join(node_names)}")
-                progress_container.info(f"⚙️ Processing: {', '.join(node_names)}")
-                
-                # Update display immediately to show progress
-                with step_container.container():
-                    display_workflow_history()
-            
-            for node, output in event.items():
-                final_state = output
-                
+    Returns:
+        Id of the started job
+    """
+    # Each workflow run gets its own checkpoint thread, scoped to this session
+    st.session_state.run_count += 1
+    thread_id = f"streamlit-{st.session_state.session_id}-{st.session_state.run_count}"
+    thread = {"configurable": {"thread_id": thread_id}, "recursion_limit": 50}
+    agent = get_workflow_agent()
+
+    job = get_job_manager().submit(
+        lambda job: stream_workflow_events(agent, list(messages_list), thread, job),
+        owner=st.session_state.session_id
+    )
+    st.session_state.job_id = job.job_id
+    st.session_state.job_cursor = 0
+    st.session_state.job_final_state = None
+    st.session_state.report_text = ""
+    add_workflow_step("Workflow Started", "processing", "Starting fact-check workflow...")
+    return job.job_id
+
+def apply_workflow_event(mode: str, event: dict, progress_container) -> None:
+    """Record one streamed workflow event in the session's progress history."""
+    # Report tokens are accumulated and rendered progressively by the poll
+    if mode == "custom":
+        if "report_chunk" in event:
+            if not st.session_state.report_text:
+                progress_container.info("📝 Writing fact-check report...")
+            st.session_state.report_text += event["report_chunk"]
+        return
+
+    # Show which node is being processed
+    node_names = list(event.keys())
+    if node_names:
+        add_workflow_step("Processing", "processing", f"Running: {', '.join(node_names)}")
+        progress_container.info(f"⚙️ Processing: {', '.join(node_names)}")
+
+    for node, output in event.items():
+        # Routing-only nodes (e.g. a verdict cache miss) have no update
+        if not output:
+            continue
+        st.session_state.job_final_state = output
+
+        if "messages" in output and output["messages"]:
+            latest_message = output["messages"][-1]
+            message_content = latest_message if isinstance(latest_message, str) else latest_message.content
+
+            # Format different node outputs - matching main.py logic
+            if node == "clarify_fact_request":
+                # Show progress for this node
+                add_workflow_step("Analyzing Claim", "processing", "Examining the claim for clarity and specificity...")
+                progress_container.info("🔍 Analyzing claim for clarity...")
+
+                # Check if this is asking for clarification or proceeding
+                is_clarification = (
+                    message_content.strip().endswith('?') or
+                    'need more' in message_content.lower() or
+                    'please provide' in message_content.lower() or
+                    'clarify' in message_content.lower() or
+                    'specify' in message_content.lower() or
+                    'additional' in message_content.lower()
+                )
+
+                if not is_clarification:
+                    add_workflow_step("Claim Analysis", "completed", f"Analysis: {message_content}")
+                    progress_container.success("✅ Claim analysis completed")
+                else:
+                    add_workflow_step("Clarification Request", "warning", "System requesting more information...")
+                    progress_container.warning("⚠️ More information needed...")
+            elif node == "write_claim_statement":
+                add_workflow_step("Generating Brief", "processing", "Creating structured fact-check brief...")
+                progress_container.info("📝 Generating fact-check brief...")
+
+                add_workflow_step("Claim Statement", "completed", "Fact-Check Brief Generated")
+                if "claim_statement" in output:
+                    st.session_state.claim_statement = output["claim_statement"]
+                    add_workflow_step("Claim Extraction", "completed", f"Claim to verify: {output['claim_statement']}")
+                progress_container.success("✅ Fact-check brief generated")
+            elif node == "check_verdict_cache":
+                add_workflow_step("Verdict Cache", "completed", message_content)
+                progress_container.success("✅ Served a recent fact-check of this claim")
+            elif node == "supervisor_subgraph":
+                add_workflow_step("Research Phase", "processing", "Fact-checking in progress...")
+                progress_container.info("🔬 Fact-checking in progress...")
+            elif node == "final_report_generation":
                 if "messages" in output and output["messages"]:
-                    latest_message = output["messages"][-1]
-                    message_content = latest_message if isinstance(latest_message, str) else latest_message.content
-                    
-                    # Format different node outputs - matching main.py logic
-                    if node == "clarify_fact_request":
-                        # Show progress for this node
-                        add_workflow_step("Analyzing Claim", "processing", "Examining the claim for clarity and specificity...")
-                        progress_container.info("🔍 Analyzing claim for clarity...")
-                        
-                        # Check if this is asking for clarification or proceeding
-                        is_clarification = (
-                            message_content.strip().endswith('?') or
-                            'need more' in message_content.lower() or
-                            'please provide' in message_content.lower() or
-                            'clarify' in message_content.lower() or
-                            'specify' in message_content.lower() or
-                            'additional' in message_content.lower()
-                        )
-                        
-                        if not is_clarification:
-                            add_workflow_step("Claim Analysis", "completed", f"Analysis: {message_content}")
-                            progress_container.success("✅ Claim analysis completed")
-                        else:
-                            add_workflow_step("Clarification Request", "warning", "System requesting more information...")
-                            progress_container.warning("⚠️ More information needed...")
-                    elif node == "write_claim_statement":
-                        add_workflow_step("Generating Brief", "processing", "Creating structured fact-check brief...")
-                        progress_container.info("📝 Generating fact-check brief...")
-                        
-                        add_workflow_step("Claim Statement", "completed", "Fact-Check Brief Generated")
-                        if "claim_statement" in output:
-                            st.session_state.claim_statement = output["claim_statement"]
-                            add_workflow_step("Claim Extraction", "completed", f"Claim to verify: {output['claim_statement']}")
-                        progress_container.success("✅ Fact-check brief generated")
-                    elif node == "supervisor_subgraph":
-                        add_workflow_step("Research Phase", "processing", "Fact-checking in progress...")
-                        progress_container.info("🔬 Fact-checking in progress...")
-                    elif node == "final_report_generation":
-                        if "messages" in output and output["messages"]:
-                            latest_msg = output["messages"][-1]
-                            msg_content = latest_msg if isinstance(latest_msg, str) else latest_msg.content
-                            
-                            if "saved to:" in msg_content:
-                                add_workflow_step("Report Generation", "completed", msg_content)
-                                progress_container.success("✅ Report generated and saved")
-                            else:
-                                add_workflow_step("Report Generation", "processing", "Generating fact-check report...")
-                                progress_container.info("📝 Generating fact-check report...")
-                
-                # Update display in real-time
-                with step_container.container():
-                    display_workflow_history()
-        
-        # Critical logic from main.py lines 141-163: Check if workflow ended at clarification step
-        if final_state and len(final_state.get("messages", [])) > 0:
-            last_message = final_state["messages"][-1]
-            last_content = last_message.content if hasattr(last_message, 'content') else str(last_message)
-            
-            # If workflow ended without final_report, it needs clarification - EXACT logic from main.py
-            if "final_report" not in final_state:
-                add_workflow_step("Clarification Needed", "warning", f"System needs more information: {last_content}")
-                progress_container.warning("⚠️ Additional information required to complete fact-check")
-                return {"needs_clarification": True, "message": last_content, "final_state": final_state}
-            else:
-                # Workflow completed successfully
-                if "final_report" in final_state:
-                    add_workflow_step("Workflow Complete", "completed", "Fact-check completed successfully")
-                    progress_container.success("✅ Fact-check workflow completed!")
-                    return {"completed": True, "final_report": final_state["final_report"], "final_state": final_state}
+                    latest_msg = output["messages"][-1]
+                    msg_content = latest_msg if isinstance(latest_msg, str) else latest_msg.content
+
+                    if "saved to:" in msg_content:
+                        add_workflow_step("Report Generation", "completed", msg_content)
+                        progress_container.success("✅ Report generated and saved")
+                    else:
+                        add_workflow_step("Report Generation", "processing", "Generating fact-check report...")
+                        progress_container.info("📝 Generating fact-check report...")
+
+def workflow_result(final_state: Optional[dict], progress_container) -> Dict[str, Any]:
+    """Turn the final workflow state into the result handled by the processing view."""
+    # Check if workflow ended at clarification step - mirroring main.py
+    if final_state and len(final_state.get("messages", [])) > 0:
+        last_message = final_state["messages"][-1]
+        last_content = last_message.content if hasattr(last_message, 'content') else str(last_message)
+
+        # If workflow ended without final_report, it needs clarification - EXACT logic from main.py
+        if "final_report" not in final_state:
+            add_workflow_step("Clarification Needed", "warning", f"System needs more information: {last_content}")
+            progress_container.warning("⚠️ Additional information required to complete fact-check")
+            return {"needs_clarification": True, "message": last_content, "final_state": final_state}
         else:
-            add_workflow_step("Workflow Complete", "completed", "Fact-check workflow completed")
-            progress_container.success("✅ Fact-check workflow completed!")
-            return {"completed": True, "final_state": final_state}
+            # Workflow completed successfully
+            if "final_report" in final_state:
+                add_workflow_step("Workflow Complete", "completed", "Fact-check completed successfully")
+                progress_container.success("✅ Fact-check workflow completed!")
+                return {"completed": True, "final_report": final_state["final_report"], "final_state": final_state}
+    else:
+        add_workflow_step("Workflow Complete", "completed", "Fact-check workflow completed")
+        progress_container.success("✅ Fact-check workflow completed!")
+        return {"completed": True, "final_state": final_state}
+
+def poll_fact_check_job(step_container, progress_container, report_container) -> Optional[Dict[str, Any]]:
+    """
+    Render the progress of this session's job and return its result once finished.
+    
+    Args:
+        step_container: Streamlit container for step updates
+        progress_container: Streamlit container for progress messages
+        report_container: Streamlit placeholder rendering the report while it streams
         
-    except Exception as e:
-        add_workflow_step("Error", "error", f"Workflow failed: {str(e)}")
-        progress_container.error(f"❌ An error occurred: {str(e)}")
-        return {"error": str(e)}
+    Returns:
+        Dictionary describing the workflow outcome, or None while the job is still running
+    """
+    job = get_job_manager().get(st.session_state.job_id, owner=st.session_state.session_id)
+    if job is None:
+        add_workflow_step("Error", "error", "The fact-check job is no longer available")
+        return {"error": "The fact-check job is no longer available"}
+
+    events, st.session_state.job_cursor = job.events_since(st.session_state.job_cursor)
+    for mode, event in events:
+        apply_workflow_event(mode, event, progress_container)
+
+    if st.session_state.report_text:
+        report_container.markdown(st.session_state.report_text)
+    with step_container.container():
+        display_workflow_history()
+
+    if not job.done:
+        return None
+    if job.status != "completed":
+        error = job.error or f"Job {job.status}"
+        add_workflow_step("Error", "error", f"Workflow failed: {error}")
+        progress_container.error(f"❌ An error occurred: {error}")
+        return {"error": error}
+    return workflow_result(st.session_state.job_final_state, progress_container)
 
 def main():
     """Main Streamlit application."""
@@ -277,8 +393,12 @@ def main():
         st.header("📊 Session Info")
         st.write(f"Workflow State: `{st.session_state.workflow_state}`")
         st.write(f"Messages: {len(st.session_state.messages)}")
+        st.write(f"Active fact-checks on server: {get_job_manager().active_jobs()}")
         
         if st.button("🔄 Reset Session"):
+            # Stop this session's running job before forgetting it
+            if st.session_state.job_id:
+                get_job_manager().cancel(st.session_state.job_id, owner=st.session_state.session_id)
             for key in list(st.session_state.keys()):
                 del st.session_state[key]
             st.rerun()
@@ -316,23 +436,27 @@ def main():
             
             # Create containers for real-time updates
             progress_container = st.empty()
+            report_container = st.empty()
             step_container = st.empty()
             
-            # Run the workflow
+            # Run the workflow as a background job and poll its progress on each rerun
             if st.session_state.processing:
-                # Run async workflow
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
+                result = None
+                try:
+                    if not st.session_state.job_id:
+                        start_fact_check_job(st.session_state.messages)
+                    result = poll_fact_check_job(step_container, progress_container, report_container)
+                except Exception as e:
+                    result = {"error": str(e)}
+                    add_workflow_step("Error", "error", f"Exception during workflow: {str(e)}")
+
+                if result is None:
+                    # Still running: rerun shortly without blocking this server or other sessions
+                    time.sleep(job_poll_interval)
+                    st.rerun()
+
+                st.session_state.job_id = None
                 try:
-                    # Pass the containers to the workflow function for real-time updates
-                    result = loop.run_until_complete(
-                        run_fact_check_workflow(
-                            st.session_state.messages,  # Pass all messages 
-                            step_container, 
-                            progress_container
-                        )
-                    )
-                    
                     # Handle different result types based on main.py logic
                     if result.get("needs_clarification"):
                         st.session_state.workflow_state = 'clarification'
@@ -362,9 +486,6 @@ def main():
                     st.session_state.processing = False
                     add_workflow_step("Error", "error", f"Exception during workflow: {str(e)}")
                     progress_container.error(f"❌ Exception: {str(e)}")
-                        
-                finally:
-                    loop.close()
                 
                 # Auto-refresh to move to next state
                 time.sleep(1)  # Brief pause to show final status
@@ -1,14 +1,22 @@
-
 from typing_extensions import Annotated, Literal
 
-from langchain_core.tools import tool, InjectedToolArg
-from utils import tavily_search_multiple, deduplicate_search_results, process_search_results, format_search_output
+from langchain_core.tools import tool, InjectedToolArg, StructuredTool
+from utils import (
+    run_async,
+    atavily_search_multiple,
+    deduplicate_search_results,
+    aprocess_search_results,
+    filter_relevant_results,
+    format_search_output,
+)
+from dedup import collapse_near_duplicates
+from run_scope import get_run_scope
 
-@tool(parse_docstring=True)
-def tavily_search(
+async def atavily_search(
     query: str,
     max_results: Annotated[int, InjectedToolArg] = 3,
     topic: Annotated[Literal["general", "news", "finance"], InjectedToolArg] = "general",
+    claim: Annotated[str, InjectedToolArg] = "",
 ) -> str:
     """Fetch results from Tavily search API with content summarization.
 
@@ -16,12 +24,13 @@ def tavily_search(
         query: A single search query to execute
         max_results: Maximum number of results to return
         topic: Topic to filter results by ('general', 'news', 'finance')
+        claim: Claim under verification, used to focus summaries of long pages
 
     Returns:
         Formatted string of search results with summaries
     """
     # Execute search for single query
-    search_results = tavily_search_multiple(
+    search_results = await atavily_search_multiple(
         [query],  # Convert single query to list for the internal function
         max_results=max_results,
         topic=topic,
@@ -31,11 +40,50 @@ def tavily_search(
     # Deduplicate results by URL to avoid processing duplicate content
     unique_results = deduplicate_search_results(search_results)
 
-    # Process results with summarization
-    summarized_results = process_search_results(unique_results)
+    # Collapse near-duplicate pages (syndicated copies, mirrors) across every search of this claim run
+    run_scope = get_run_scope()
+    unique_results = collapse_near_duplicates(unique_results, run_scope.dedup)
+
+    # Drop or truncate low-relevance results before spending LLM calls on them
+    relevance_text = f"{query} {claim}"
+    relevant_results, skipped_results = filter_relevant_results(unique_results, relevance_text)
+
+    # Process results with concurrent summarization
+    summarized_results = await aprocess_search_results(
+        relevant_results,
+        relevance_text=relevance_text,
+        evidence_store=run_scope.evidence
+    )
 
     # Format output for consumption
-    return format_search_output(summarized_results)
+    return format_search_output(summarized_results, skipped_results)
+
+def _tavily_search(
+    query: str,
+    max_results: Annotated[int, InjectedToolArg] = 3,
+    topic: Annotated[Literal["general", "news", "finance"], InjectedToolArg] = "general",
+    claim: Annotated[str, InjectedToolArg] = "",
+) -> str:
+    """Fetch results from Tavily search API with content summarization.
+
+    Args:
+        query: A single search query to execute
+        max_results: Maximum number of results to return
+        topic: Topic to filter results by ('general', 'news', 'finance')
+        claim: Claim under verification, used to focus summaries of long pages
+
+    Returns:
+        Formatted string of search results with summaries
+    """
+    return run_async(atavily_search(query, max_results=max_results, topic=topic, claim=claim))
+
+# Expose both implementations so that invoke and ainvoke each run natively
+tavily_search = StructuredTool.from_function(
+    func=_tavily_search,
+    coroutine=atavily_search,
+    name="tavily_search",
+    parse_docstring=True,
+)
 
 @tool
 def think_tool(reflection: str) -> str:
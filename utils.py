@@ -1,17 +1,26 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
 from rich.console import Console
 from rich.panel import Panel
 import json
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
-from typing_extensions import List, Literal
+from typing_extensions import List, Literal, Optional
 
 from langchain.chat_models import init_chat_model 
 from langchain_core.messages import HumanMessage
-from tavily import TavilyClient
+from tavily import TavilyClient, AsyncTavilyClient
 
 from state_research import EvidenceSummary
-from prompts import summarize_webpage_prompt
+from prompts import summarize_webpage_prompt, combine_webpage_summaries_prompt
+from dedup import canonicalize_url
+from evidence_store import EvidenceStore
+from relevance import estimate_tokens, split_into_windows, select_relevant_windows, filter_search_results
+from cache import create_summary_cache, create_search_cache, create_verdict_cache
+from rate_limit import get_rate_limiter, aretry, provider_max_retries
 import os
 from dotenv import load_dotenv
 
@@ -19,32 +28,134 @@ load_dotenv()
 
 console = Console()
 
-def create_llm():
-    provider = os.getenv("LLM_PROVIDER", "google_genai")
-    model = os.getenv("LLM_MODEL", "gemini-2.5-flash")
-    temperature = float(os.getenv("LLM_TEMPERATURE", "0.1"))
+# Providers whose chat models accept max_retries; their SDK retries are disabled
+# in favor of rate_limit's retries, so that failed calls are not retried twice
+_sdk_retry_providers = {"openai", "azure_openai", "anthropic", "google_genai", "groq", "mistralai"}
+
+@lru_cache(maxsize=None)
+def _init_chat_model(provider: str, model: str, temperature: float, max_tokens: Optional[int] = None):
+    """Build a chat model once per distinct configuration and share it afterwards.
 
+    Models of the same provider and model share one process-wide rate limiter
+    (RATE_LIMITS), whatever their other settings.
+    """
+    kwargs = {} if max_tokens is None else {"max_tokens": max_tokens}
+    rate_limiter = get_rate_limiter(provider, model)
+    if rate_limiter is not None:
+        kwargs["rate_limiter"] = rate_limiter
+    if provider_max_retries > 0 and provider in _sdk_retry_providers:
+        kwargs["max_retries"] = 0
     return init_chat_model(
         model=model,
         model_provider=provider,
-        temperature=temperature
+        temperature=temperature,
+        **kwargs
     )
 
+# Stand-ins for provider-backed objects, installed with set_provider_overrides()
+# (e.g. by the offline benchmark). Keys: llm, compress_llm, tavily_client, async_tavily_client
+_provider_overrides = {}
+
+def set_provider_overrides(**overrides):
+    """Replace provider-backed models and clients; a value of None restores the real one.
+
+    Args:
+        **overrides: Any of llm, compress_llm, tavily_client, async_tavily_client
+    """
+    unknown = set(overrides) - {"llm", "compress_llm", "tavily_client", "async_tavily_client"}
+    if unknown:
+        raise ValueError(f"Unknown provider overrides: {', '.join(sorted(unknown))}")
+    for name, value in overrides.items():
+        if value is None:
+            _provider_overrides.pop(name, None)
+        else:
+            _provider_overrides[name] = value
+
+def create_llm():
+    if "llm" in _provider_overrides:
+        return _provider_overrides["llm"]
+    provider = os.getenv("LLM_PROVIDER", "google_genai")
+    model = os.getenv("LLM_MODEL", "gemini-2.5-flash")
+    temperature = float(os.getenv("LLM_TEMPERATURE", "0.1"))
+
+    return _init_chat_model(provider, model, temperature)
+
 def create_compress_llm():
+    if "compress_llm" in _provider_overrides:
+        return _provider_overrides["compress_llm"]
     provider = os.getenv("COMPRESS_LLM_PROVIDER", "google_genai")
     model = os.getenv("COMPRESS_LLM_MODEL", "gemini-2.5-flash")
     temperature = float(os.getenv("COMPRESS_LLM_TEMPERATURE", "0.1"))
     max_tokens= int(os.getenv("COMPRESS_LLM_MAX_TOKENS", 32000))
 
-    return init_chat_model(
-        model=model,
-        model_provider=provider,
-        temperature=temperature,
-        max_tokens=max_tokens
-    )
+    return _init_chat_model(provider, model, temperature, max_tokens)
+
+def llm_model_id() -> str:
+    """Identify the model built by create_llm, e.g. for cache keys."""
+    return f"{os.getenv('LLM_PROVIDER', 'google_genai')}:{os.getenv('LLM_MODEL', 'gemini-2.5-flash')}"
+
+def compress_llm_model_id() -> str:
+    """Identify the model built by create_compress_llm."""
+    return f"{os.getenv('COMPRESS_LLM_PROVIDER', 'google_genai')}:{os.getenv('COMPRESS_LLM_MODEL', 'gemini-2.5-flash')}"
+
+# Clients and caches are created on first use, so importing this module
+# neither requires API keys nor opens connections.
+
+@lru_cache(maxsize=None)
+def _default_tavily_client() -> TavilyClient:
+    return TavilyClient()
+
+@lru_cache(maxsize=None)
+def _default_async_tavily_client() -> AsyncTavilyClient:
+    return AsyncTavilyClient()
+
+def get_tavily_client() -> TavilyClient:
+    return _provider_overrides.get("tavily_client") or _default_tavily_client()
+
+def get_async_tavily_client() -> AsyncTavilyClient:
+    return _provider_overrides.get("async_tavily_client") or _default_async_tavily_client()
+
+@lru_cache(maxsize=None)
+def get_summary_cache():
+    return create_summary_cache(llm_model_id())
+
+@lru_cache(maxsize=None)
+def get_search_cache():
+    return create_search_cache()
+
+@lru_cache(maxsize=None)
+def get_verdict_cache():
+    return create_verdict_cache()
+
+_lazy_attributes = {
+    "summarization_model": create_llm,
+    "tavily_client": get_tavily_client,
+    "async_tavily_client": get_async_tavily_client,
+}
+
+def __getattr__(name: str):
+    """Resolve the former module-level clients lazily for existing importers."""
+    if name in _lazy_attributes:
+        return _lazy_attributes[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Maximum number of Tavily requests a single multi-query search keeps in flight
+max_concurrent_searches = int(os.getenv("TAVILY_MAX_CONCURRENT_SEARCHES", "5"))
+
+# Maximum number of webpages summarized at the same time for one search
+max_concurrent_summaries = int(os.getenv("SUMMARIZATION_MAX_CONCURRENCY", "5"))
 
-summarization_model = create_llm() 
-tavily_client = TavilyClient()
+# Token budget of one summarization window and how many windows of a long page are kept
+summary_chunk_tokens = int(os.getenv("SUMMARY_CHUNK_TOKENS", "4000"))
+summary_max_chunks = int(os.getenv("SUMMARY_MAX_CHUNKS", "4"))
+
+# Relevance pre-filter applied to search results before summarization
+search_relevance_filter = os.getenv("SEARCH_RELEVANCE_FILTER", "true").lower() in ("1", "true", "yes")
+search_relevance_min_score = float(os.getenv("SEARCH_RELEVANCE_MIN_SCORE", "0.2"))
+search_relevance_max_paragraphs = int(os.getenv("SEARCH_RELEVANCE_MAX_PARAGRAPHS", "8"))
+
+# Characters of relevant page text kept when summarization fails
+summary_fallback_chars = int(os.getenv("SUMMARY_FALLBACK_CHARS", "4000"))
 
 def get_today_str() -> str:
     """Get current date in a human-readable format."""
@@ -108,76 +219,269 @@ def get_current_dir() -> Path:
     except NameError:  # __file__ is not defined
         return Path.cwd()
 
+def run_async(coro):
+    """Run a coroutine to completion from synchronous code.
+
+    Uses ``asyncio.run`` when no event loop is running in the current thread.
+    When called from inside a running loop (e.g. a notebook cell), the coroutine
+    is executed on a fresh loop in a worker thread instead of blocking the caller's loop.
+
+    Args:
+        coro: Coroutine to execute
+
+    Returns:
+        The coroutine's result
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
 
 # Search functions
 
-def tavily_search_multiple(
+async def atavily_search_multiple(
     search_queries: List[str], 
     max_results: int = 3, 
     topic: Literal["general", "news", "finance"] = "general", 
     include_raw_content: bool = True, 
+    max_concurrency: Optional[int] = None,
 ) -> List[dict]:
-    """Perform search using Tavily API for multiple queries.
+    """Perform concurrent searches using the async Tavily client.
+
+    All queries are issued at once, with at most ``max_concurrency`` requests
+    in flight, so a multi-query search takes roughly as long as its slowest query.
+    Responses go through the search cache, which also collapses concurrent
+    identical queries into a single request. Requests share the process-wide
+    "tavily" rate limiter and are retried on rate-limit and server errors.
 
     Args:
         search_queries: List of search queries to execute
         max_results: Maximum number of results per query
         topic: Topic filter for search results
         include_raw_content: Whether to include raw webpage content
+        max_concurrency: Maximum concurrent requests (defaults to TAVILY_MAX_CONCURRENT_SEARCHES)
 
     Returns:
-        List of search result dictionaries
+        List of search result dictionaries, in the same order as search_queries
     """
-    
-    # Execute searches sequentially. Note: yon can use AsyncTavilyClient to parallelize this step.
-    search_docs = []
-    for query in search_queries:
-        result = tavily_client.search(
+    semaphore = asyncio.Semaphore(max_concurrency or max_concurrent_searches)
+
+    rate_limiter = get_rate_limiter("tavily")
+
+    async def request(query: str) -> dict:
+        if rate_limiter is not None:
+            await rate_limiter.aacquire()
+        return await get_async_tavily_client().search(
             query,
             max_results=max_results,
             include_raw_content=include_raw_content,
             topic=topic
         )
-        search_docs.append(result)
 
-    return search_docs
+    async def fetch(query: str) -> dict:
+        async with semaphore:
+            return await aretry(lambda: request(query), provider="tavily")
 
-def summarize_webpage_content(webpage_content: str) -> str:
+    async def search(query: str) -> dict:
+        search_cache = get_search_cache()
+        if search_cache is None:
+            return await fetch(query)
+        return await search_cache.get_or_fetch(
+            query, max_results, topic, include_raw_content,
+            fetch=lambda: fetch(query)
+        )
+
+    return list(await asyncio.gather(*(search(query) for query in search_queries)))
+
+def tavily_search_multiple(
+    search_queries: List[str], 
+    max_results: int = 3, 
+    topic: Literal["general", "news", "finance"] = "general", 
+    include_raw_content: bool = True, 
+) -> List[dict]:
+    """Perform search using Tavily API for multiple queries.
+
+    Synchronous wrapper around atavily_search_multiple.
+
+    Args:
+        search_queries: List of search queries to execute
+        max_results: Maximum number of results per query
+        topic: Topic filter for search results
+        include_raw_content: Whether to include raw webpage content
+
+    Returns:
+        List of search result dictionaries
+    """
+    return run_async(atavily_search_multiple(
+        search_queries,
+        max_results=max_results,
+        topic=topic,
+        include_raw_content=include_raw_content,
+    ))
+
+def format_evidence_summary(summary: EvidenceSummary) -> str:
+    """Render a structured evidence summary as tagged text for the research agent.
+
+    Args:
+        summary: Structured summary (or stored Evidence) with summary, key excerpts and stance
+
+    Returns:
+        Formatted summary with key excerpts and stance
+    """
+    return (
+        f"<summary>\n{summary.summary}\n</summary>\n\n"
+        f"<key_excerpts>\n{summary.key_excerpts}\n</key_excerpts>"
+        f"<stance>\n{summary.stance}\n</stance>"
+    )
+
+def truncate_webpage_content(webpage_content: str) -> str:
+    """Fallback used when a webpage cannot be summarized."""
+    if len(webpage_content) <= summary_fallback_chars:
+        return webpage_content
+    return webpage_content[:summary_fallback_chars] + "..."
+
+def select_webpage_windows(webpage_content: str, relevance_text: str = "") -> List[str]:
+    """Split a long page into token-bounded windows and keep the most relevant ones.
+
+    Pages within SUMMARY_CHUNK_TOKENS are returned whole as a single window.
+
+    Args:
+        webpage_content: Raw webpage content
+        relevance_text: Search query and claim used to rank windows
+
+    Returns:
+        Up to SUMMARY_MAX_CHUNKS windows, in page order
+    """
+    if estimate_tokens(webpage_content) <= summary_chunk_tokens:
+        return [webpage_content]
+    windows = split_into_windows(webpage_content, summary_chunk_tokens)
+    return select_relevant_windows(windows, relevance_text, summary_max_chunks)
+
+async def _asummarize_window(webpage_content: str, semaphore: Optional[asyncio.Semaphore] = None) -> EvidenceSummary:
+    structured_model = create_llm().with_structured_output(EvidenceSummary)
+    messages = [
+        HumanMessage(content=summarize_webpage_prompt.format(
+            webpage_content=webpage_content, 
+            date=get_today_str()
+        ))
+    ]
+    async with semaphore or nullcontext():
+        return await aretry(lambda: structured_model.ainvoke(messages), provider=llm_model_id())
+
+async def _acombine_summaries(summaries: List[EvidenceSummary], semaphore: Optional[asyncio.Semaphore] = None) -> EvidenceSummary:
+    structured_model = create_llm().with_structured_output(EvidenceSummary)
+    partial_summaries = "\n\n".join(
+        f"<section_{i}>\n{format_evidence_summary(summary)}\n</section_{i}>"
+        for i, summary in enumerate(summaries, 1)
+    )
+    messages = [
+        HumanMessage(content=combine_webpage_summaries_prompt.format(
+            partial_summaries=partial_summaries,
+            date=get_today_str()
+        ))
+    ]
+    async with semaphore or nullcontext():
+        return await aretry(lambda: structured_model.ainvoke(messages), provider=llm_model_id())
+
+def summarize_webpage_content(webpage_content: str, url: Optional[str] = None, relevance_text: str = "") -> str:
     """Summarize webpage content using the configured summarization model.
+
+    Synchronous wrapper around asummarize_webpage_content.
     
     Args:
         webpage_content: Raw webpage content to summarize
+        url: URL of the page, used as part of the cache key
+        relevance_text: Search query and claim used to pick the relevant parts of long pages
         
     Returns:
         Formatted summary with key excerpts
     """
-    try:
-        # Set up structured output model for summarization
-        structured_model = summarization_model.with_structured_output(EvidenceSummary)
-        
-        # Generate summary
-        summary = structured_model.invoke([
-            HumanMessage(content=summarize_webpage_prompt.format(
-                webpage_content=webpage_content, 
-                date=get_today_str()
-            ))
-        ])
+    return run_async(asummarize_webpage_content(webpage_content, url=url, relevance_text=relevance_text))
+
+async def asummarize_webpage(
+    webpage_content: str,
+    url: Optional[str] = None,
+    relevance_text: str = "",
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> Optional[EvidenceSummary]:
+    """Produce a structured evidence summary of a webpage.
+
+    Long pages are split into token-bounded windows; only the windows most
+    relevant to relevance_text are summarized, in parallel, and the partial
+    summaries are then merged into one evidence summary (map-reduce).
+    Summaries are served from the on-disk summary cache when the same content
+    was already summarized with the same model and prompt. Rate-limited and
+    server errors are retried before giving up.
+    
+    Args:
+        webpage_content: Raw webpage content to summarize
+        url: URL of the page, used as part of the cache key
+        relevance_text: Search query and claim used to pick the relevant parts of long pages
+        semaphore: Optional semaphore bounding concurrent model calls
         
-        # Format summary with clear structure
-        formatted_summary = (
-            f"<summary>\n{summary.summary}\n</summary>\n\n"
-            f"<key_excerpts>\n{summary.key_excerpts}\n</key_excerpts>"
-            f"<stance>\n{summary.stance}\n</stance>"
-        )
+    Returns:
+        Structured summary, or None if summarization failed
+    """
+    windows = select_webpage_windows(webpage_content, relevance_text)
+    selected_content = "\n\n".join(windows)
+
+    try:
+        summary_cache = get_summary_cache()
+        summary = summary_cache.get(url, selected_content) if summary_cache else None
+
+        if summary is None:
+            if len(windows) == 1:
+                summary = await _asummarize_window(windows[0], semaphore)
+            else:
+                partial_summaries = await asyncio.gather(
+                    *(_asummarize_window(window, semaphore) for window in windows)
+                )
+                summary = await _acombine_summaries(partial_summaries, semaphore)
+
+            if summary_cache:
+                summary_cache.set(url, selected_content, summary)
         
-        return formatted_summary
+        return summary
         
     except Exception as e:
         print(f"Failed to summarize webpage: {str(e)}")
-        return webpage_content[:1000] + "..." if len(webpage_content) > 1000 else webpage_content
+        return None
+
+def summarization_fallback(webpage_content: str, relevance_text: str = "") -> str:
+    """Text used in place of a summary: the most relevant part of the page rather than its first lines."""
+    return truncate_webpage_content("\n\n".join(select_webpage_windows(webpage_content, relevance_text)))
+
+async def asummarize_webpage_content(
+    webpage_content: str,
+    url: Optional[str] = None,
+    relevance_text: str = "",
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> str:
+    """Summarize webpage content using the configured summarization model.
+    
+    Args:
+        webpage_content: Raw webpage content to summarize
+        url: URL of the page, used as part of the cache key
+        relevance_text: Search query and claim used to pick the relevant parts of long pages
+        semaphore: Optional semaphore bounding concurrent model calls
+        
+    Returns:
+        Formatted summary with key excerpts, or relevant page text if summarization failed
+    """
+    summary = await asummarize_webpage(webpage_content, url, relevance_text, semaphore)
+    if summary is None:
+        return summarization_fallback(webpage_content, relevance_text)
+    return format_evidence_summary(summary)
 
 def deduplicate_search_results(search_results: List[dict]) -> dict:
     """Deduplicate search results by URL to avoid processing duplicate content.
+
+    URLs are compared in canonical form, so scheme, "www."/AMP variants and
+    tracking parameters of the same page count as duplicates.
     
     Args:
         search_results: List of search result dictionaries
@@ -186,46 +490,114 @@ def deduplicate_search_results(search_results: List[dict]) -> dict:
         Dictionary mapping URLs to unique results
     """
     unique_results = {}
+    seen_urls = set()
     
     for response in search_results:
         for result in response['results']:
             url = result['url']
-            if url not in unique_results:
+            canonical_url = canonicalize_url(url)
+            if canonical_url not in seen_urls:
+                seen_urls.add(canonical_url)
                 unique_results[url] = result
     
     return unique_results
 
-def process_search_results(unique_results: dict) -> dict:
-    """Process search results by summarizing content where available.
+def filter_relevant_results(unique_results: dict, relevance_text: str) -> tuple[dict, List[dict]]:
+    """Apply the configured relevance pre-filter to deduplicated search results.
     
     Args:
         unique_results: Dictionary of unique search results
+        relevance_text: Search query and claim
         
     Returns:
-        Dictionary of processed results with summaries
+        Tuple of (results to summarize, skipped results report)
     """
-    summarized_results = {}
+    if not search_relevance_filter:
+        return unique_results, []
+    return filter_search_results(
+        unique_results,
+        relevance_text,
+        min_relative_score=search_relevance_min_score,
+        max_paragraphs=search_relevance_max_paragraphs,
+    )
+
+async def aprocess_search_results(
+    unique_results: dict,
+    max_concurrency: Optional[int] = None,
+    relevance_text: str = "",
+    evidence_store: Optional[EvidenceStore] = None,
+) -> dict:
+    """Process search results by summarizing all raw contents concurrently.
+
+    With an evidence store, each source is looked up by its near-duplicate
+    cluster (or canonical URL) first and only summarized if no agent of the run
+    has summarized it yet; results then carry their evidence ID.
     
-    for url, result in unique_results.items():
-        # Use existing content if no raw content for summarization
-        if not result.get("raw_content"):
-            content = result['content']
-        else:
-            # Summarize raw content for better processing
-            content = summarize_webpage_content(result['raw_content'])
+    Args:
+        unique_results: Dictionary of unique search results
+        max_concurrency: Maximum concurrent summarization calls (defaults to SUMMARIZATION_MAX_CONCURRENCY)
+        relevance_text: Search query and claim used to pick the relevant parts of long pages
+        evidence_store: Evidence store of the claim run
         
-        summarized_results[url] = {
-            'title': result['title'],
-            'content': content
-        }
+    Returns:
+        Dictionary of processed results with summaries, in the same order as unique_results
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or max_concurrent_summaries)
+
+    async def process(url: str, result: dict) -> dict:
+        raw_content = result.get("raw_content")
+
+        if evidence_store is None:
+            # Use existing content if no raw content for summarization
+            if not raw_content:
+                content = result['content']
+            else:
+                content = await asummarize_webpage_content(
+                    raw_content, url=url, relevance_text=relevance_text, semaphore=semaphore
+                )
+            return {'title': result['title'], 'content': content}
+
+        key = result.get("cluster_id") or canonicalize_url(url)
+        if not raw_content:
+            evidence = evidence_store.get(key) or evidence_store.add(
+                key, url, result['title'], result['content'], structured=False
+            )
+        else:
+            evidence = await evidence_store.get_or_add(
+                key, url, result['title'],
+                summarize=lambda: asummarize_webpage(
+                    raw_content, url=url, relevance_text=relevance_text, semaphore=semaphore
+                ),
+                fallback=lambda: summarization_fallback(raw_content, relevance_text),
+            )
+
+        content = format_evidence_summary(evidence) if evidence.structured else evidence.summary
+        return {'title': result['title'], 'content': content, 'evidence_id': evidence.evidence_id}
+
+    processed = await asyncio.gather(*(process(url, result) for url, result in unique_results.items()))
+
+    return dict(zip(unique_results.keys(), processed))
+
+def process_search_results(unique_results: dict, relevance_text: str = "") -> dict:
+    """Process search results by summarizing content where available.
+
+    Synchronous wrapper around aprocess_search_results.
     
-    return summarized_results
+    Args:
+        unique_results: Dictionary of unique search results
+        relevance_text: Search query and claim used to pick the relevant parts of long pages
+        
+    Returns:
+        Dictionary of processed results with summaries
+    """
+    return run_async(aprocess_search_results(unique_results, relevance_text=relevance_text))
 
-def format_search_output(summarized_results: dict) -> str:
+def format_search_output(summarized_results: dict, skipped_results: Optional[List[dict]] = None) -> str:
     """Format search results into a well-structured string output.
     
     Args:
         summarized_results: Dictionary of processed search results
+        skipped_results: Results dropped or truncated by the relevance pre-filter
         
     Returns:
         Formatted string of search results with clear source separation
@@ -236,10 +608,15 @@ def format_search_output(summarized_results: dict) -> str:
     formatted_output = "Search results: \n\n"
     
     for i, (url, result) in enumerate(summarized_results.items(), 1):
-        formatted_output += f"\n\n--- SOURCE {i}: {result['title']} ---\n"
+        source_id = f"[{result['evidence_id']}]" if result.get('evidence_id') else str(i)
+        formatted_output += f"\n\n--- SOURCE {source_id}: {result['title']} ---\n"
         formatted_output += f"URL: {url}\n\n"
         formatted_output += f"SUMMARY:\n{result['content']}\n\n"
         formatted_output += "-" * 80 + "\n"
+
+    if skipped_results:
+        formatted_output += f"\nFiltered {len(skipped_results)} low-relevance source(s) before summarization:\n"
+        for skipped in skipped_results:
+            formatted_output += f"- {skipped['title']} ({skipped['url']}): {skipped['reason']}\n"
     
     return formatted_output
-